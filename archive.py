@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from extractor import extract_company
+
+ARCHIVE_DIR = 'archive'
+CODECS = ('zstd', 'gzip')
+DEFAULT_CODEC = 'zstd' if zstandard else 'gzip'
+_SUFFIX = {'zstd': '.html.zst', 'gzip': '.html.gz'}
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class HtmlArchive:
+    """Content-addressed store of fetched profile HTML.
+
+    Pages live under `objects/<sha[:2]>/<sha>.html.<codec>`, so identical
+    pages are stored once. `index.jsonl` has one line per fetch with the URL,
+    fetch time, digest and codec.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, codec=DEFAULT_CODEC):
+        if codec == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd archive requested but the zstandard package is not installed")
+        self.root = root
+        self.codec = codec
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._lock = threading.Lock()
+
+    def object_path(self, digest, codec):
+        return os.path.join(self.root, 'objects', digest[:2], digest + _SUFFIX[codec])
+
+    def put(self, url, html):
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest, self.codec)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(compress(data, self.codec))
+            os.replace(tmp_path, path)
+        entry = {"url": url, "fetched_at": time.time(), "sha256": digest, "codec": self.codec}
+        with self._lock, open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def get(self, entry):
+        with open(self.object_path(entry["sha256"], entry["codec"]), 'rb') as f:
+            return decompress(f.read(), entry["codec"])
+
+    def latest_entries(self):
+        """Newest index entry per URL."""
+        latest = {}
+        if not os.path.exists(self.index_path):
+            return latest
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                current = latest.get(entry["url"])
+                if current is None or entry["fetched_at"] >= current["fetched_at"]:
+                    latest[entry["url"]] = entry
+        return latest
+
+
+def _reparse_entry(job):
+    root, entry = job
+    try:
+        html = HtmlArchive(root, entry["codec"]).get(entry)
+        return extract_company(html, entry["url"])
+    except Exception:
+        return None
+
+def reparse_archive(root, output, workers=None, chunksize=64):
+    """Re-run extraction over the newest archived page of every URL, no browser."""
+    archive = HtmlArchive(root, DEFAULT_CODEC)
+    entries = list(archive.latest_entries().values())
+    print(f"Re-extracting {len(entries)} archived pages with {workers or os.cpu_count()} processes")
+    start_time = time.time()
+    extracted = missed = 0
+    tmp_path = output + '.tmp'
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(tmp_path, 'w', encoding='utf-8') as f:
+        jobs = ((root, entry) for entry in entries)
+        for record in pool.map(_reparse_entry, jobs, chunksize=chunksize):
+            if record:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                extracted += 1
+            else:
+                missed += 1
+    os.replace(tmp_path, output)
+    elapsed = time.time() - start_time
+    print(f"Wrote {extracted} records to {output} ({missed} pages without a record) in {elapsed:.1f}s")
+    return extracted
@@ -0,0 +1,215 @@
+"""End-to-end benchmark: the real scraper against a local PitchBook stand-in.
+
+Usage: python bench_e2e.py [--pages N] [--concurrency N] [-- SCRAPER OPTIONS]
+
+Serves the pages in bench_fixtures/ (profiles, a 404, a challenge
+interstitial, a slow response and malformed markup) from 127.0.0.1, runs
+scraper.py on them in a scratch directory and reports pages/min, per-stage
+latency, peak RSS of the scraper's process tree and whether every record
+matches bench_fixtures/golden.json. Exits non-zero on any mismatch.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, 'bench_fixtures')
+PROFILE_PATH = re.compile(r'^/profiles/company/(\d+)-(\d\d)$')
+
+
+def load_fixtures(root=FIXTURES_DIR):
+    with open(os.path.join(root, 'fixtures.json'), 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    for fixture in fixtures:
+        with open(os.path.join(root, fixture["file"]), 'rb') as f:
+            fixture["body"] = f.read()
+    with open(os.path.join(root, 'golden.json'), 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    return fixtures, golden
+
+def start_server(fixtures):
+    """Serve fixture k at /profiles/company/<n>-<k>; returns (server, base_url)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = PROFILE_PATH.match(self.path.split('?')[0])
+            index = int(match.group(2)) if match else -1
+            if not 0 <= index < len(fixtures):
+                self.send_error(404)
+                return
+            fixture = fixtures[index]
+            if fixture.get("delay"):
+                time.sleep(fixture["delay"])
+            self.send_response(fixture.get("status", 200))
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(fixture["body"])))
+            self.end_headers()
+            self.wfile.write(fixture["body"])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def build_urls(fixtures, base_url, pages):
+    """`pages` URLs cycling through the fixtures in proportion to their weight."""
+    cycle = [i for i, fixture in enumerate(fixtures) for _ in range(fixture.get("weight", 1))]
+    return [(f"{base_url}/profiles/company/{100000 + n}-{cycle[n % len(cycle)]:02d}", cycle[n % len(cycle)])
+            for n in range(pages)]
+
+def tree_rss_mb(proc):
+    try:
+        procs = [proc] + proc.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0.0
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+def run_scraper(workdir, urls_file, args, scraper_args):
+    """Run scraper.py to completion, sampling the process tree's RSS; returns (seconds, peak MB, exit code)."""
+    command = [
+        sys.executable, os.path.join(HERE, 'scraper.py'),
+        '--urls', urls_file,
+        '--concurrency', str(args.concurrency),
+        # A fixed, generous rate: the stand-in never throttles, so pacing
+        # would only add noise to the numbers
+        '--max-rate', str(args.rate), '--min-rate', str(args.rate),
+        # Challenges and errors are dead-lettered at once instead of waiting out backoffs
+        '--retry-budget', '1',
+        '--stats-interval', '1', '--status-interval', '1',
+    ] + scraper_args
+    log_path = os.path.join(workdir, 'scraper.log')
+    started = time.monotonic()
+    peak = 0.0
+    with open(log_path, 'w') as log:
+        child = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+        proc = psutil.Process(child.pid)
+        while child.poll() is None:
+            peak = max(peak, tree_rss_mb(proc))
+            time.sleep(0.25)
+    return time.monotonic() - started, peak, child.returncode
+
+def read_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def read_jsonl(path):
+    records = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records
+
+def check_results(workdir, urls, fixtures, golden):
+    """Compare what the scraper wrote against the expected outcome of every URL."""
+    records = {record["url"]: record for record in read_jsonl(os.path.join(workdir, 'results.json'))}
+    dead = {entry["url"] for entry in read_jsonl(os.path.join(workdir, 'dead_letter.jsonl'))}
+    scraped = set()
+    if os.path.exists(os.path.join(workdir, 'scraped_links.log')):
+        with open(os.path.join(workdir, 'scraped_links.log'), 'r', encoding='utf-8') as f:
+            scraped = set(f.read().splitlines())
+    failures = []
+    for url, index in urls:
+        fixture = fixtures[index]
+        expect = fixture["expect"]
+        record = records.get(url)
+        if expect == "record":
+            wanted = dict(golden[fixture.get("golden", fixture["name"])], url=url)
+            if record is None:
+                failures.append((url, fixture["name"], "no record"))
+            elif record != wanted:
+                diff = sorted(k for k in set(record) | set(wanted) if record.get(k) != wanted.get(k))
+                failures.append((url, fixture["name"], f"fields differ: {', '.join(diff)}"))
+        elif record is not None:
+            failures.append((url, fixture["name"], "unexpected record"))
+        elif expect == "not_found" and url not in scraped:
+            failures.append((url, fixture["name"], "not checkpointed as done"))
+        elif expect == "challenge" and url not in dead:
+            failures.append((url, fixture["name"], "not dead-lettered"))
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100, help='URLs to scrape (default: 100)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Scraper workers (default: 2)')
+    parser.add_argument('--rate', type=float, default=20.0, help='Requests per second allowed (default: 20)')
+    parser.add_argument('--workdir', default=None, help='Empty directory to run in (default: a new temp directory)')
+    parser.add_argument('--report', default=None, help='Also write the report as JSON to this file')
+    parser.add_argument('scraper_args', nargs=argparse.REMAINDER,
+                        help='Extra scraper options after --, e.g. -- --extract-mode html')
+    args = parser.parse_args()
+    scraper_args = args.scraper_args[1:] if args.scraper_args[:1] == ['--'] else args.scraper_args
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='pitchbook_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    if os.listdir(workdir):
+        # A leftover checkpoint would make the scraper skip URLs
+        parser.error(f"--workdir {workdir} is not empty")
+
+    fixtures, golden = load_fixtures()
+    server, base_url = start_server(fixtures)
+    urls = build_urls(fixtures, base_url, args.pages)
+    urls_file = os.path.join(workdir, 'bench_urls.txt')
+    with open(urls_file, 'w', encoding='utf-8') as f:
+        f.write(''.join(url + '\n' for url, _ in urls))
+
+    print(f"Serving {len(fixtures)} fixtures at {base_url}; scraping {len(urls)} URLs in {workdir}")
+    try:
+        seconds, peak_mb, code = run_scraper(workdir, urls_file, args, scraper_args)
+    finally:
+        server.shutdown()
+
+    stats = read_json(os.path.join(workdir, 'scraper_stats.json'))
+    done = read_json(os.path.join(workdir, 'scraper_status.json')).get("done", 0)
+    failures = check_results(workdir, urls, fixtures, golden)
+
+    print(f"\nScraper exit code: {code} (log: {os.path.join(workdir, 'scraper.log')})")
+    print(f"Wall time: {seconds:.1f}s | {done}/{len(urls)} pages | {done / seconds * 60:.1f} pages/min | "
+          f"peak tree RSS {peak_mb:.0f}MB")
+    print(f"Outcomes: {stats.get('counters', {}).get('outcome', {})}")
+    print("Stage latency:")
+    for stage, data in sorted(stats.get("stages", {}).items()):
+        print(f"  {stage:<12} n={data['count']:<6} p50={data.get('p50_s', 0) * 1000:.0f}ms "
+              f"p95={data.get('p95_s', 0) * 1000:.0f}ms p99={data.get('p99_s', 0) * 1000:.0f}ms")
+    print(f"Correctness: {len(urls) - len(failures)}/{len(urls)} URLs as expected")
+    for url, name, problem in failures[:20]:
+        print(f"  [{name}] {url}: {problem}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({
+                "pages": len(urls),
+                "done": done,
+                "seconds": round(seconds, 2),
+                "pages_per_min": round(done / seconds * 60, 1),
+                "peak_tree_rss_mb": round(peak_mb, 1),
+                "exit_code": code,
+                "stages": stats.get("stages", {}),
+                "outcomes": stats.get("counters", {}).get("outcome", {}),
+                "failures": [{"url": u, "fixture": n, "problem": p} for u, n, p in failures],
+            }, f, indent=1)
+    sys.exit(1 if failures or code else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Compare the compiled lxml extractor against the old BeautifulSoup walk.
+
+Usage: python bench_extract.py PAGE.html [DIR ...] [--repeat N]
+
+Every saved profile is run through both extractors; any difference in the
+output is reported and makes the script exit non-zero.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup, Tag
+
+from extractor import extract_company
+
+
+def safe_text(tag):
+    return tag.get_text(strip=True) if tag else None
+
+def legacy_extract(html, url):
+    """The BeautifulSoup extractor scrape_company_from_page used before the schema."""
+    soup = BeautifulSoup(html, "lxml")
+
+    name_tag = soup.find("h2", class_="XL-8 L-7 M-5 S-4 pp-overview__title mb-xl-0")
+    if isinstance(name_tag, Tag):
+        span = name_tag.find("span")
+        name = span.get_text(strip=True) if isinstance(span, Tag) else safe_text(name_tag)
+    else:
+        name = None
+    if not name:
+        return None
+
+    overview_items = soup.find_all("div", class_="pp-overview-item")
+    founded = status = latest_deal_type = financing_rounds = None
+    for item in overview_items:
+        label = item.find("li", class_="dont-break text-small")
+        value = item.find("span", class_="pp-overview-item__title font-weight-bold d-block-XL mb-xl-0")
+        if not (isinstance(label, Tag) and isinstance(value, Tag)):
+            continue
+        label_text = label.get_text(strip=True).lower()
+        value_text = value.get_text(strip=True)
+        if "founded" in label_text:
+            founded = value_text
+        elif "status" in label_text:
+            status = value_text
+        elif "latest deal type" in label_text:
+            latest_deal_type = value_text
+        elif "financing rounds" in label_text:
+            financing_rounds = value_text
+
+    description = safe_text(soup.find("p", class_="pp-description_text mb-xl-0"))
+
+    website_tag = soup.find("a", class_="d-block-XL font-underline")
+    website = website_tag.get("href") if isinstance(website_tag, Tag) and website_tag.has_attr("href") else None
+
+    contact_info_items = soup.find_all("div", class_="pp-contact-info_item")
+    ownership_status = financing_status = primary_industry = parent_company = None
+    verticals = []
+    other_industries = []
+    for item in contact_info_items:
+        label_div = item.find("div", class_="font-weight-bold font-color-black")
+        if not isinstance(label_div, Tag):
+            continue
+        label_text = label_div.get_text(strip=True).lower()
+        value_divs = label_div.find_next_siblings("div", class_="font-weight-normal font-color-black ellipsis-XL")
+        if "ownership status" in label_text and value_divs:
+            ownership_status = safe_text(value_divs[0])
+        elif "financing status" in label_text and value_divs:
+            financing_status = safe_text(value_divs[0])
+        elif "primary industry" in label_text and value_divs:
+            primary_industry = safe_text(value_divs[0])
+        elif "parent company" in label_text and value_divs:
+            parent_company = safe_text(value_divs[0])
+        elif "vertical" in label_text:
+            for a in item.find_all("a", class_="font-underline"):
+                verticals.append({
+                    "name": a.get_text(strip=True),
+                    "url": a.get("href") if a.has_attr("href") else None
+                })
+        elif "other industries" in label_text:
+            other_industries = [safe_text(div) for div in value_divs if safe_text(div)]
+
+    address = soup.find("ul", class_="list-type-none XL-12")
+    address_parts = [li.get_text(strip=True) for li in address.find_all("li")] if isinstance(address, Tag) else []
+
+    return {
+        "name": name,
+        "url": url,
+        "founded": founded,
+        "status": status,
+        "latest_deal_type": latest_deal_type,
+        "financing_rounds": financing_rounds,
+        "description": description,
+        "website": website,
+        "ownership_status": ownership_status,
+        "financing_status": financing_status,
+        "primary_industry": primary_industry,
+        "parent_company": parent_company,
+        "address": address_parts,
+        "verticals": verticals,
+        "other_industries": other_industries
+    }
+
+def collect_pages(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            pages.extend(sorted(glob.glob(os.path.join(path, "*.html"))))
+        else:
+            pages.append(path)
+    return pages
+
+def time_extractor(extract, docs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, html in docs:
+            extract(html, url)
+    return (time.perf_counter() - start) / (repeat * len(docs))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark old vs compiled profile extraction")
+    parser.add_argument('paths', nargs='+', help='Saved profile HTML files or directories of *.html')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the page set (default: 20)')
+    args = parser.parse_args()
+
+    pages = collect_pages(args.paths)
+    if not pages:
+        print("No HTML pages found")
+        return 1
+    # page.content() hands the old extractor a str; the new one takes raw bytes
+    raw = []
+    for path in pages:
+        with open(path, 'rb') as f:
+            raw.append((path, f.read()))
+    text = [(url, html.decode('utf-8', errors='replace')) for url, html in raw]
+
+    mismatches = 0
+    for (url, html_bytes), (_, html_text) in zip(raw, text):
+        old, new = legacy_extract(html_text, url), extract_company(html_bytes, url)
+        if old != new:
+            mismatches += 1
+            print(f"[MISMATCH] {url}\n  old: {old}\n  new: {new}")
+
+    old_s = time_extractor(legacy_extract, text, args.repeat)
+    new_s = time_extractor(extract_company, raw, args.repeat)
+    print(f"Pages: {len(pages)} x {args.repeat}")
+    print(f"BeautifulSoup: {old_s * 1000:.2f} ms/page")
+    print(f"Compiled lxml: {new_s * 1000:.2f} ms/page ({old_s / new_s:.1f}x faster)")
+    print(f"Mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import json
+import os
+from done_index import DoneIndex, url_key
+
+# This run's keys are merged into the mapped index once this many pile up
+MERGE_EVERY = 100000
+
+
+class CheckpointJournal:
+    """Append-only record of finished URLs, one URL per line.
+
+    Marking a URL done is a single O(1) append, so a run no longer rewrites
+    the whole checkpoint after every profile, and a kill mid-write can at
+    worst leave one torn line at the end, which is dropped on the next load.
+    Because every line is a distinct URL, `wc -l` on the journal is the
+    number of scraped URLs.
+
+    Membership is answered by a DoneIndex of canonical integer keys kept
+    next to the journal (`<path>.idx`), not a set of URL strings. Loading
+    maps the index and replays only the lines appended since it was saved.
+    URLs finished during the run are merged into the index every
+    `merge_every` additions, so a long run's memory stays bounded too.
+    """
+
+    def __init__(self, path, legacy_path=None, merge_every=MERGE_EVERY):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.merge_every = merge_every
+        self.index = DoneIndex(path + '.idx')
+        self._f = None
+
+    def __contains__(self, url):
+        return url_key(url) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def load(self, readonly=False):
+        """Map the index and replay the journal past it.
+
+        `readonly` leaves every file as it is and opens nothing for append,
+        for checking against a journal another run owns.
+        """
+        if os.path.exists(self.path):
+            self._read_journal(readonly)
+        elif self.legacy_path and os.path.exists(self.legacy_path) and not readonly:
+            self._migrate_legacy()
+        else:
+            self.index.reset()
+        if not readonly:
+            self._f = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def _read_journal(self, readonly=False):
+        covered = self.index.load()
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if covered:
+                f.seek(covered - 1)
+                if covered > size or f.read(1) != b'\n':
+                    # The journal was replaced behind the index's back: rebuild it
+                    self.index.reset()
+                    covered = 0
+            f.seek(covered)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data) and not readonly:
+            # Torn final line from a crash mid-append
+            with open(self.path, 'r+b') as f:
+                f.truncate(covered + end)
+        for line in data[:end].decode('utf-8', errors='replace').splitlines():
+            if line:
+                self.index.add(url_key(line))
+        if (end or not os.path.exists(self.index.path)) and not readonly:
+            self.index.save(covered + end)
+
+    def _migrate_legacy(self):
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                urls = json.load(f)
+        except Exception:
+            urls = []
+        self.index.reset()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for url in urls:
+                key = url_key(url)
+                if key not in self.index and '\n' not in url:
+                    self.index.add(key)
+                    f.write(url + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            written = f.tell()
+        os.replace(tmp_path, self.path)
+        self.index.save(written)
+        print(f"Migrated {len(self.index)} URLs from {self.legacy_path} to {self.path}")
+
+    def add(self, url):
+        key = url_key(url)
+        if key in self.index or '\n' in url:
+            return
+        self.index.add(key)
+        self._f.write(url + '\n')
+        self._f.flush()
+        if len(self.index.added) >= self.merge_every:
+            self.index.save(self._f.tell())
+
+    def flush(self, fsync=False):
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        if self._f:
+            # Fold this run's URLs into the index so the next load skips them
+            self._f.flush()
+            self.index.save(os.fstat(self._f.fileno()).st_size)
+            self._f.close()
+            self._f = None
+        self.index.close()
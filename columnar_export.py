@@ -0,0 +1,168 @@
+import json
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from done_index import PROFILE_ID
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+# Small vocabularies repeated across millions of profiles
+CATEGORICAL_FIELDS = ('status', 'latest_deal_type', 'ownership_status', 'financing_status', 'primary_industry')
+# Small enough for min/max statistics to skip most row groups on a
+# company_id filter over a compacted (ID-sorted) export
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def export_schema():
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    vertical = pa.struct([('name', pa.string()), ('url', pa.string())])
+    return pa.schema([
+        ('url', pa.string()),
+        # Same key as the checkpoint index: /profiles/company/12345-67 -> 1234567
+        ('company_id', pa.int64()),
+        ('name', pa.string()),
+        ('founded', pa.string()),
+        ('status', categorical),
+        ('latest_deal_type', categorical),
+        ('financing_rounds', pa.string()),
+        ('description', pa.string()),
+        ('website', pa.string()),
+        ('ownership_status', categorical),
+        ('financing_status', categorical),
+        ('primary_industry', categorical),
+        ('parent_company', pa.string()),
+        ('address', pa.list_(pa.string())),
+        ('verticals', pa.list_(vertical)),
+        ('other_industries', pa.list_(pa.string())),
+    ])
+
+def company_id(url):
+    match = PROFILE_ID.search(url or '')
+    return int(match.group(1)) * 100 + int(match.group(2)) if match else None
+
+
+class ColumnarWriter:
+    """Writes profile records to Parquet or Arrow IPC, one row group at a time.
+
+    Categorical fields are dictionary-encoded against one dictionary per
+    field that only ever grows, so codes stay valid from one row group to
+    the next (Arrow IPC gets dictionary deltas, not replacements). Records
+    are converted to Arrow as they arrive and only the columns of the
+    current row group are held in memory. The file is written under
+    `.tmp` and renamed by `close()`, so a reader never sees a file without
+    its footer. Every row group but the last holds exactly `row_group_size`
+    rows, whatever the size of the batches passed to `write()`.
+    """
+
+    def __init__(self, path, fmt='parquet', row_group_size=ROW_GROUP_SIZE):
+        if pa is None:
+            raise RuntimeError("columnar export needs pyarrow (pip install pyarrow)")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {EXPORT_FORMATS}, got {fmt!r}")
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.row_group_size = max(1, row_group_size)
+        self.schema = export_schema()
+        self.dictionaries = {name: {} for name in CATEGORICAL_FIELDS}
+        self.pending = []
+        self.pending_rows = 0
+        self.rows = 0
+        if fmt == 'parquet':
+            self._writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+        else:
+            options = ipc.IpcWriteOptions(compression='zstd', emit_dictionary_deltas=True)
+            self._writer = ipc.new_file(self.tmp_path, self.schema, options=options)
+        self.fmt = fmt
+
+    def write(self, records):
+        if not records:
+            return
+        columns = {}
+        for field in self.schema:
+            if field.name == 'company_id':
+                values = [company_id(record.get('url')) for record in records]
+            else:
+                values = [record.get(field.name) for record in records]
+            if field.name in CATEGORICAL_FIELDS:
+                codes = self.dictionaries[field.name]
+                columns[field.name] = pa.array(
+                    [None if value is None else codes.setdefault(value, len(codes)) for value in values],
+                    pa.int32())
+            else:
+                columns[field.name] = pa.array(values, field.type)
+        self.pending.append(columns)
+        self.pending_rows += len(records)
+        if self.pending_rows >= self.row_group_size:
+            self._write_groups(final=False)
+
+    def flush(self):
+        """Write everything buffered, the last row group possibly short."""
+        self._write_groups(final=True)
+
+    def _write_groups(self, final):
+        # Row groups hold exactly row_group_size rows; a remainder waits
+        # for more records unless this is the final flush
+        if not self.pending_rows:
+            return
+        columns = {field.name: pa.concat_arrays([chunk[field.name] for chunk in self.pending])
+                   for field in self.schema}
+        start = 0
+        while self.pending_rows - start >= self.row_group_size or (final and start < self.pending_rows):
+            length = min(self.row_group_size, self.pending_rows - start)
+            self._write_batch({name: array.slice(start, length) for name, array in columns.items()})
+            start += length
+        remaining = self.pending_rows - start
+        self.pending = [{name: array.slice(start) for name, array in columns.items()}] if remaining else []
+        self.pending_rows = remaining
+
+    def _write_batch(self, columns):
+        arrays = []
+        for field in self.schema:
+            array = columns[field.name]
+            if field.name in CATEGORICAL_FIELDS:
+                dictionary = pa.array(list(self.dictionaries[field.name]), pa.string())
+                array = pa.DictionaryArray.from_arrays(array, dictionary)
+            arrays.append(array)
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if self.fmt == 'parquet':
+            self._writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def export_results(inputs, output, fmt='parquet', row_group_size=ROW_GROUP_SIZE, chunk=5000):
+    """Stream JSONL results files into one columnar file."""
+    start_time = time.time()
+    writer = ColumnarWriter(output, fmt, row_group_size)
+    records = []
+    for path in inputs:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(records) >= chunk:
+                    writer.write(records)
+                    records = []
+    writer.write(records)
+    writer.close()
+    elapsed = time.time() - start_time
+    size_in = sum(os.path.getsize(path) for path in inputs)
+    size_out = os.path.getsize(output)
+    print(f"Exported {writer.rows} records to {output} in {elapsed:.1f}s "
+          f"({size_in / 1e6:.1f}MB JSONL -> {size_out / 1e6:.1f}MB {fmt})")
+    return writer.rows
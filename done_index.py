@@ -0,0 +1,123 @@
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+PROFILE_ID = re.compile(r'/profiles/company/(\d{1,16})-(\d\d)(?=[/?#]|$)')
+HASHED = 1 << 63
+INDEX_MAGIC = b'PBDONE01'
+# Magic, then the journal size (bytes) the keys cover
+HEADER = struct.Struct('<8sQ')
+
+
+def url_key(url):
+    """Canonical 64-bit key for a URL.
+
+    Company profiles map to their numeric ID (`/profiles/company/12345-67` ->
+    1234567), whatever the host, scheme or query string. Any other URL is
+    hashed into the upper half of the key space, so it can never collide
+    with an ID.
+    """
+    match = PROFILE_ID.search(url)
+    if match:
+        return int(match.group(1)) * 100 + int(match.group(2))
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') | HASHED
+
+
+class DoneIndex:
+    """Set of finished URL keys: a sorted uint64 file mapped into memory plus this run's additions.
+
+    Lookups are a binary search over the mapped keys (pages are only read
+    as they are touched, so loading is instant and memory is about 8 bytes
+    per URL) or a hit in the small `added` set. `save()` merges the
+    additions into a new sorted file. The file records how much of the
+    journal it covers, so a load only replays the journal past that point.
+    Lookups may come from other threads while `save()` swaps in the new file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.covered = 0
+        self.added = set()
+        self._map = None
+        self._view = None
+        self.keys = memoryview(array('Q'))
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self.added:
+                return True
+            i = bisect_left(self.keys, key)
+            return i < len(self.keys) and self.keys[i] == key
+
+    def __len__(self):
+        return len(self.keys) + len(self.added)
+
+    def add(self, key):
+        self.added.add(key)
+
+    def load(self):
+        """Map the index file; returns the journal offset it covers (0 if there is none)."""
+        self._unmap()
+        self.covered = 0
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header)[0] != INDEX_MAGIC:
+                return 0
+            size = os.fstat(f.fileno()).st_size
+            if size > HEADER.size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+                self.keys = self._view[HEADER.size:size - (size - HEADER.size) % 8].cast('Q')
+        self.covered = HEADER.unpack(header)[1]
+        return self.covered
+
+    def reset(self):
+        """Forget everything, e.g. when the journal no longer matches the index."""
+        self._unmap()
+        self.covered = 0
+        self.added = set()
+
+    def save(self, covered):
+        """Merge this run's keys into the sorted file, atomically."""
+        if not self.added and covered == self.covered and os.path.exists(self.path):
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, covered))
+            chunk = array('Q')
+            for key in heapq.merge(self.keys, sorted(self.added)):
+                chunk.append(key)
+                if len(chunk) >= 65536:
+                    chunk.tofile(f)
+                    del chunk[:]
+            chunk.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self._unmap()
+            os.replace(tmp_path, self.path)
+            self.added = set()
+            self.load()
+
+    def _unmap(self):
+        self.keys.release()
+        self.keys = memoryview(array('Q'))
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self):
+        self._unmap()
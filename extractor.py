@@ -0,0 +1,310 @@
+import json
+
+from lxml import etree
+
+NOT_FOUND_MARKER = "404 - Profile not found | PitchBook"
+OVERVIEW_MARKER = "Company Overview"
+TITLE_MARKER = "pp-overview__title"
+CLOUDFLARE_PHRASES = [
+    "Just a moment", "Checking your browser", "Ray ID",
+    "Verifying you are human", "/cdn-cgi/challenge-platform/",
+    "Cloudflare Security"
+]
+
+# Field definitions for a PitchBook company profile. Element tests follow
+# BeautifulSoup's class_ semantics: a single class matches any element that
+# carries it, a space-separated string must equal the whole class attribute.
+COMPANY_SCHEMA = {
+    "name": {
+        "select": ("h2", "XL-8 L-7 M-5 S-4 pp-overview__title mb-xl-0"),
+        # Prefer the inner span's text when the title has one
+        "prefer": ("span", None),
+    },
+    "overview": {
+        "items": ("div", "pp-overview-item"),
+        "label": ("li", "dont-break text-small"),
+        "value": ("span", "pp-overview-item__title font-weight-bold d-block-XL mb-xl-0"),
+        # First label keyword that matches wins
+        "fields": [
+            ("founded", "founded"),
+            ("status", "status"),
+            ("latest deal type", "latest_deal_type"),
+            ("financing rounds", "financing_rounds"),
+        ],
+    },
+    "description": {"select": ("p", "pp-description_text mb-xl-0")},
+    "website": {"select": ("a", "d-block-XL font-underline"), "attr": "href"},
+    "contact": {
+        "items": ("div", "pp-contact-info_item"),
+        "label": ("div", "font-weight-bold font-color-black"),
+        # Values are the label's following sibling divs
+        "values": ("div", "font-weight-normal font-color-black ellipsis-XL"),
+        # (label keyword, field, kind); "first" rules only apply when values exist
+        "fields": [
+            ("ownership status", "ownership_status", "first"),
+            ("financing status", "financing_status", "first"),
+            ("primary industry", "primary_industry", "first"),
+            ("parent company", "parent_company", "first"),
+            ("vertical", "verticals", "links"),
+            ("other industries", "other_industries", "texts"),
+        ],
+        "links": ("a", "font-underline"),
+    },
+    "address": {"select": ("ul", "list-type-none XL-12"), "items": ("li", None)},
+}
+
+# Order of keys in the output record
+RECORD_FIELDS = [
+    "name", "url", "founded", "status", "latest_deal_type", "financing_rounds",
+    "description", "website", "ownership_status", "financing_status",
+    "primary_industry", "parent_company", "address", "verticals", "other_industries",
+]
+
+# Text as BeautifulSoup's get_text sees it: no comments, scripts or styles
+TEXT_XPATH = ".//text()[not(parent::script) and not(parent::style) and not(parent::template)]"
+# Links to other profiles, for link discovery
+PROFILE_LINKS_XPATH = "//a[contains(@href, '/profiles/')]/@href"
+
+
+def element_test(tag, classes=None):
+    """XPath step for `tag` filtered by class the way BeautifulSoup's class_ does."""
+    if not classes:
+        return tag
+    if " " in classes:
+        return f"{tag}[normalize-space(@class)='{classes}']"
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {classes} ')]"
+
+
+def first(step, axis="descendant"):
+    return f"({axis}::{step})[1]"
+
+
+def compile_schema(schema):
+    """Turn the declarative schema into XPath strings, shared by every backend."""
+    overview, contact = schema["overview"], schema["contact"]
+    return {
+        "name": first(element_test(*schema["name"]["select"])),
+        "name_prefer": first(element_test(*schema["name"]["prefer"])),
+        "overview_items": "descendant::" + element_test(*overview["items"]),
+        "overview_label": first(element_test(*overview["label"])),
+        "overview_value": first(element_test(*overview["value"])),
+        "description": first(element_test(*schema["description"]["select"])),
+        "website": first(element_test(*schema["website"]["select"])),
+        "contact_items": "descendant::" + element_test(*contact["items"]),
+        "contact_label": first(element_test(*contact["label"])),
+        "contact_values": "following-sibling::" + element_test(*contact["values"]),
+        "contact_links": "descendant::" + element_test(*contact["links"]),
+        "address": first(element_test(*schema["address"]["select"])),
+        "address_items": "descendant::" + element_test(*schema["address"]["items"]),
+        "text": TEXT_XPATH,
+        "profile_links": PROFILE_LINKS_XPATH,
+    }
+
+
+COMPANY_XPATHS = compile_schema(COMPANY_SCHEMA)
+_XP = {key: etree.XPath(expr) for key, expr in COMPANY_XPATHS.items()}
+_HTML_PARSER = etree.HTMLParser(encoding="utf-8")
+
+
+def _one(key, node):
+    found = _XP[key](node)
+    return found[0] if found else None
+
+
+def _text(node):
+    return "".join(s.strip() for s in _XP["text"](node))
+
+
+def parse_html(html):
+    """Parse raw page HTML (bytes or str) into an lxml tree, or None if empty."""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    return etree.fromstring(html, _HTML_PARSER) if html.strip() else None
+
+
+def extract_company(html, url, links=None):
+    """Extract a company record from profile HTML; None when there is no name.
+
+    If `links` is a list, the hrefs of links to other profiles are appended to it.
+    """
+    root = parse_html(html)
+    if root is None:
+        return None
+    if links is not None:
+        links.extend(str(href) for href in _XP["profile_links"](root))
+    return extract_company_tree(root, url)
+
+
+def extract_company_tree(root, url):
+    schema = COMPANY_SCHEMA
+    record = dict.fromkeys(RECORD_FIELDS)
+    record["url"] = url
+
+    # --- Name ---
+    name_tag = _one("name", root)
+    if name_tag is None:
+        return None
+    span = _one("name_prefer", name_tag)
+    record["name"] = _text(span if span is not None else name_tag)
+    if not record["name"]:
+        return None
+
+    # --- Overview Items (by label) ---
+    for item in _XP["overview_items"](root):
+        label = _one("overview_label", item)
+        value = _one("overview_value", item)
+        if label is None or value is None:
+            continue
+        label_text = _text(label).lower()
+        for keyword, field in schema["overview"]["fields"]:
+            if keyword in label_text:
+                record[field] = _text(value)
+                break
+
+    # --- Description ---
+    description_tag = _one("description", root)
+    record["description"] = _text(description_tag) if description_tag is not None else None
+
+    # --- Website ---
+    website_tag = _one("website", root)
+    record["website"] = website_tag.get(schema["website"]["attr"]) if website_tag is not None else None
+
+    # --- Contact Info Items (by label) ---
+    record["verticals"] = []
+    record["other_industries"] = []
+    for item in _XP["contact_items"](root):
+        label = _one("contact_label", item)
+        if label is None:
+            continue
+        label_text = _text(label).lower()
+        values = _XP["contact_values"](label)
+        for keyword, field, kind in schema["contact"]["fields"]:
+            if keyword not in label_text:
+                continue
+            if kind == "first":
+                if not values:
+                    continue
+                record[field] = _text(values[0])
+            elif kind == "links":
+                record[field].extend(
+                    {"name": _text(a), "url": a.get("href")}
+                    for a in _XP["contact_links"](item)
+                )
+            elif kind == "texts":
+                record[field] = [text for text in map(_text, values) if text]
+            break
+
+    # --- Address ---
+    address = _one("address", root)
+    record["address"] = [_text(li) for li in _XP["address_items"](address)] if address is not None else []
+
+    return record
+
+
+def inspect_html(html):
+    """Page flags for serialized HTML; the record is parsed separately from `html`."""
+    return {
+        "not_found": NOT_FOUND_MARKER in html,
+        "challenge": any(phrase in html for phrase in CLOUDFLARE_PHRASES),
+        "has_overview": OVERVIEW_MARKER in html,
+        "has_title": TITLE_MARKER in html,
+        "record": None,
+        "html": html,
+    }
+
+
+def build_browser_js(xpaths, schema, fields):
+    """Same rules as extract_company_tree, as one function for page.evaluate.
+
+    Only the flags and the small record cross the Playwright pipe; the DOM
+    is never serialized back to Python. Called with `[url, wantLinks]`;
+    profile links are only collected when `wantLinks` is set.
+    """
+    config = {
+        "xp": xpaths,
+        "overview": schema["overview"]["fields"],
+        "contact": schema["contact"]["fields"],
+        "websiteAttr": schema["website"]["attr"],
+        "fields": fields,
+        "notFound": NOT_FOUND_MARKER,
+        "overviewMarker": OVERVIEW_MARKER,
+        "titleMarker": TITLE_MARKER,
+        "challenge": CLOUDFLARE_PHRASES,
+    }
+    return """([url, wantLinks]) => {
+    const C = %s;
+    const all = (key, node) => {
+        const res = document.evaluate(C.xp[key], node, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const out = [];
+        for (let i = 0; i < res.snapshotLength; i++) out.push(res.snapshotItem(i));
+        return out;
+    };
+    const one = (key, node) => all(key, node)[0] || null;
+    const text = (node) => all("text", node).map((t) => t.nodeValue.trim()).join("");
+
+    const html = document.documentElement ? document.documentElement.outerHTML : "";
+    const info = {
+        not_found: html.includes(C.notFound),
+        challenge: C.challenge.some((phrase) => html.includes(phrase)),
+        has_overview: html.includes(C.overviewMarker),
+        has_title: html.includes(C.titleMarker),
+        record: null,
+    };
+
+    const nameTag = one("name", document);
+    if (!nameTag) return info;
+    const span = one("name_prefer", nameTag);
+    const name = text(span || nameTag);
+    if (!name) return info;
+
+    const record = {};
+    for (const field of C.fields) record[field] = null;
+    record.name = name;
+    record.url = url;
+
+    for (const item of all("overview_items", document)) {
+        const label = one("overview_label", item);
+        const value = one("overview_value", item);
+        if (!label || !value) continue;
+        const labelText = text(label).toLowerCase();
+        const rule = C.overview.find(([keyword]) => labelText.includes(keyword));
+        if (rule) record[rule[1]] = text(value);
+    }
+
+    const description = one("description", document);
+    record.description = description ? text(description) : null;
+    const website = one("website", document);
+    record.website = website ? website.getAttribute(C.websiteAttr) : null;
+
+    record.verticals = [];
+    record.other_industries = [];
+    for (const item of all("contact_items", document)) {
+        const label = one("contact_label", item);
+        if (!label) continue;
+        const labelText = text(label).toLowerCase();
+        const values = all("contact_values", label);
+        const rule = C.contact.find(([keyword, , kind]) =>
+            labelText.includes(keyword) && (kind !== "first" || values.length));
+        if (!rule) continue;
+        const [, field, kind] = rule;
+        if (kind === "first") {
+            record[field] = text(values[0]);
+        } else if (kind === "links") {
+            for (const a of all("contact_links", item)) {
+                record[field].push({name: text(a), url: a.getAttribute("href")});
+            }
+        } else if (kind === "texts") {
+            record[field] = values.map(text).filter((t) => t);
+        }
+    }
+
+    const address = one("address", document);
+    record.address = address ? all("address_items", address).map(text) : [];
+
+    info.record = record;
+    if (wantLinks) info.links = all("profile_links", document).map((href) => href.nodeValue);
+    return info;
+}""" % json.dumps(config)
+
+
+BROWSER_EXTRACT_JS = build_browser_js(COMPANY_XPATHS, COMPANY_SCHEMA, RECORD_FIELDS)
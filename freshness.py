@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FRESHNESS_FILE = 'freshness.db'
+RECRAWL_ORDERS = ('age', 'changes')
+# Profiles that changed most often on past re-fetches first, with a prior
+# so never-rechecked pages sit in the middle; ascending like the keyset
+CHANGE_RANK = "-(changes + 1.0) / (checks + 2.0)"
+
+
+def record_hash(record):
+    """Stable hash of an extracted record, independent of key order."""
+    data = json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FreshnessStore:
+    """Per-URL fetch history used to recrawl only what is stale and store only what changed.
+
+    For every profile it keeps the last fetch time, the hash of the last
+    extracted record, the ETag/Last-Modified validators and how often a
+    re-fetch found the record changed. `check()` runs when a record comes
+    in and decides whether it needs writing; `commit()` is called by the
+    results sink once the batch is on disk, so the stored hash never runs
+    ahead of results.json.
+    """
+
+    def __init__(self, path=FRESHNESS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                record_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched REAL NOT NULL DEFAULT 0,
+                changed REAL,
+                checks INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0
+            )""")
+        # Both recrawl orders page through an index that matches their sort
+        self.db.execute("DROP INDEX IF EXISTS pages_fetched")
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_due ON pages (fetched, url)")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS pages_changes ON pages ({CHANGE_RANK}, fetched, url)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def seed_from_results(self, results_path, batch=10000):
+        """Add profiles from results.json that the store has not seen yet.
+
+        Only the part of the file appended since the last call is read.
+        Fetch times are unknown, so seeded URLs are due on the next recrawl;
+        for a URL saved more than once, the last record's hash wins.
+        """
+        if not os.path.exists(results_path):
+            return 0
+        offset = int(self._get_meta('seeded_offset') or 0)
+        if os.path.getsize(results_path) < offset:
+            # results.json was replaced: start over
+            offset = 0
+        seeded = 0
+        rows = []
+        with open(results_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("url"):
+                    rows.append((record["url"], record_hash(record)))
+                if len(rows) >= batch:
+                    seeded += self._seed(rows, offset)
+                    rows = []
+        seeded += self._seed(rows, offset)
+        return seeded
+
+    def _seed(self, rows, offset):
+        with self._lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("""
+                INSERT INTO pages (url, record_hash) VALUES (?, ?)
+                ON CONFLICT(url) DO UPDATE SET record_hash = excluded.record_hash
+                WHERE fetched = 0""", rows)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded_offset', ?)", (str(offset),))
+            self.db.execute("COMMIT")
+        return len(rows)
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def validators(self, url):
+        """(etag, last_modified) from the last fetch, for a conditional request."""
+        with self._lock:
+            row = self.db.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        return row if row and any(row) else None
+
+    def check(self, url, record, validators=None):
+        """Metadata for `record`; meta["changed"] is False when it matches the stored hash."""
+        digest = record_hash(record)
+        with self._lock:
+            row = self.db.execute("SELECT record_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        known = row is not None and row[0] is not None
+        return self._meta(url, digest, validators, changed=not known or row[0] != digest, known=known)
+
+    def not_modified(self, url, validators=None):
+        """Metadata for a 304 or other confirmation that nothing changed."""
+        return self._meta(url, None, validators, changed=False, known=True)
+
+    def gone(self, url):
+        """Metadata for a profile that no longer exists: only its fetch time is kept."""
+        return self._meta(url, None, None, changed=False, known=False)
+
+    def _meta(self, url, digest, validators, changed, known):
+        etag, last_modified = validators or (None, None)
+        return {"url": url, "hash": digest, "etag": etag, "last_modified": last_modified,
+                "changed": changed, "known": known, "fetched": time.time()}
+
+    def commit(self, metas):
+        """Store fetch results for URLs whose records are now on disk."""
+        if not metas:
+            return
+        rows = [(m["url"], m["hash"], m["etag"], m["last_modified"], m["fetched"],
+                 m["fetched"] if m["changed"] else None, int(m["known"]),
+                 int(m["known"] and m["changed"])) for m in metas]
+        with self._lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("""
+                INSERT INTO pages (url, record_hash, etag, last_modified, fetched, changed, checks, changes)
+                VALUES (?, ?, ?, ?, ?, ?, 0, 0)
+                ON CONFLICT(url) DO UPDATE SET
+                    record_hash = coalesce(excluded.record_hash, record_hash),
+                    etag = coalesce(excluded.etag, etag),
+                    last_modified = coalesce(excluded.last_modified, last_modified),
+                    fetched = excluded.fetched,
+                    changed = coalesce(excluded.changed, changed),
+                    checks = checks + ?,
+                    changes = changes + ?""", rows)
+            self.db.execute("COMMIT")
+
+    def count_due(self, max_age):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM pages WHERE fetched < ?",
+                                   (time.time() - max_age,)).fetchone()[0]
+
+    def due(self, max_age, order='age', page=1000):
+        """URLs last fetched more than `max_age` seconds ago, streamed.
+
+        order='age' serves the stalest first; order='changes' serves the
+        profiles that changed most often on past re-fetches first (with a
+        prior, so never-rechecked pages sit in the middle). URLs come in
+        keyset pages of `page`, each read in its own short transaction: a
+        read held open for the whole recrawl would stop WAL checkpoints
+        while this run writes, and the -wal file would grow without bound.
+        URLs fetched again meanwhile are no longer due and drop out.
+        """
+        if order not in RECRAWL_ORDERS:
+            raise ValueError(f"order must be one of {RECRAWL_ORDERS}, got {order!r}")
+        cutoff = time.time() - max_age
+        if order == 'age':
+            yield from self._due_pages(cutoff, "", (), page)
+            return
+        # One rank at a time: the index seeks to the rank, then to (fetched, url) within it
+        rank = None
+        while True:
+            after = "" if rank is None else f"AND {CHANGE_RANK} > ?"
+            with self._lock:
+                row = self.db.execute(f"SELECT {CHANGE_RANK} FROM pages WHERE fetched < ? {after} "
+                                      f"ORDER BY {CHANGE_RANK} LIMIT 1",
+                                      (cutoff,) if rank is None else (cutoff, rank)).fetchone()
+            if row is None:
+                return
+            rank = row[0]
+            yield from self._due_pages(cutoff, f"AND {CHANGE_RANK} = ?", (rank,), page)
+
+    def _due_pages(self, cutoff, where, params, page):
+        """Due URLs that also match `where`, in (fetched, url) order, one short read per page."""
+        last = None
+        while True:
+            after = "" if last is None else "AND (fetched, url) > (?, ?)"
+            with self._lock:
+                rows = self.db.execute(f"SELECT fetched, url FROM pages WHERE fetched < ? {where} {after} "
+                                       f"ORDER BY fetched, url LIMIT ?",
+                                       (cutoff, *params, *(last or ()), page)).fetchall()
+            for fetched, url in rows:
+                yield url
+            if len(rows) < page:
+                return
+            last = rows[-1]
+
+    def close(self):
+        self.db.close()
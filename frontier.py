@@ -0,0 +1,144 @@
+import re
+import sqlite3
+import threading
+from urllib.parse import urljoin, urlsplit
+
+from done_index import url_key
+
+FRONTIER_FILE = 'frontier.db'
+# Only company profiles have an extractor; other types would all end as dead letters
+PROFILE_TYPES = ('company',)
+PROFILE_PATH = re.compile(r'^/profiles/([a-z-]+)/([^/]+)')
+
+
+def canonical_profile_url(href, base_url, types):
+    """`https://host/profiles/<type>/<slug>` for a profile link on the same host, else None.
+
+    Relative links are resolved against the page; query strings, fragments
+    and anything after the slug are dropped, so every spelling of a link
+    maps to one URL.
+    """
+    parts = urlsplit(urljoin(base_url, href.strip()))
+    base = urlsplit(base_url)
+    if parts.scheme not in ('http', 'https') or parts.netloc.lower() != base.netloc.lower():
+        return None
+    match = PROFILE_PATH.match(parts.path)
+    if not match or match.group(1) not in types:
+        return None
+    return f"{base.scheme}://{base.netloc.lower()}/profiles/{match.group(1)}/{match.group(2)}"
+
+def _row_key(url):
+    # SQLite integers are signed; hashed keys use the top bit
+    key = url_key(url)
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class Frontier:
+    """Persistent priority queue of profile URLs found while crawling.
+
+    The table doubles as the seen-set: each URL is keyed by its 64-bit
+    checkpoint key, so a link found again only raises its `hits`. URLs fed
+    from the list are claimed here too, so links back to them are ignored.
+    Pending URLs come out shallowest first, then most linked-to. `taken`
+    is 0 while a URL is pending, 1 once it is handed out and 2 once it is
+    finished; URLs handed out but never finished are put back on the next
+    start.
+    """
+
+    def __init__(self, path=FRONTIER_FILE, max_depth=2, types=PROFILE_TYPES):
+        self.path = path
+        self.max_depth = max_depth
+        self.types = tuple(types)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                key INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                taken INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS frontier_next ON frontier (taken, depth, hits DESC)")
+        self.db.execute("UPDATE frontier SET taken = 0 WHERE taken = 1")
+
+    def pending(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM frontier WHERE taken = 0").fetchone()[0]
+
+    def depth(self, url):
+        """Discovery depth of `url`; URLs from the list (or unknown) are depth 0."""
+        with self._lock:
+            row = self.db.execute("SELECT depth FROM frontier WHERE key = ?", (_row_key(url),)).fetchone()
+        return row[0] if row else 0
+
+    def discover(self, page_url, hrefs, keep=None):
+        """Queue the profile links found on `page_url`; returns how many were new.
+
+        `keep` filters the canonical URLs, e.g. to drop ones already scraped.
+        """
+        depth = self.depth(page_url) + 1
+        if depth > self.max_depth:
+            return 0
+        urls = {canonical_profile_url(href, page_url, self.types) for href in hrefs if href}
+        rows = [(_row_key(url), url) for url in urls if url and (keep is None or keep(url))]
+        if not rows:
+            return 0
+        with self._lock:
+            self.db.execute("BEGIN")
+            added = self.db.executemany("INSERT OR IGNORE INTO frontier (key, url, depth) VALUES (?, ?, ?)",
+                                        [(key, url, depth) for key, url in rows]).rowcount
+            self.db.executemany("UPDATE frontier SET hits = hits + 1 WHERE key = ? AND taken = 0",
+                                [(key,) for key, url in rows])
+            self.db.execute("COMMIT")
+        return added
+
+    def claim(self, urls):
+        """Record URLs from the list as taken at depth 0; returns those the frontier did not have.
+
+        A URL the frontier already holds is fed from there instead, so no
+        profile is fetched from both the list and the frontier.
+        """
+        fresh = []
+        with self._lock:
+            self.db.execute("BEGIN")
+            for url in urls:
+                if self.db.execute("INSERT OR IGNORE INTO frontier (key, url, depth, taken) VALUES (?, ?, 0, 1)",
+                                   (_row_key(url), url)).rowcount:
+                    fresh.append(url)
+            self.db.execute("COMMIT")
+        return fresh
+
+    def pop(self, n, keep=None):
+        """Up to `n` pending URLs that pass `keep`, best first, marked taken.
+
+        URLs `keep` rejects are marked finished, so they are not offered again.
+        """
+        while True:
+            with self._lock:
+                self.db.execute("BEGIN IMMEDIATE")
+                rows = self.db.execute("SELECT key, url FROM frontier WHERE taken = 0 "
+                                       "ORDER BY depth, hits DESC LIMIT ?", (n,)).fetchall()
+                self.db.executemany("UPDATE frontier SET taken = 1 WHERE key = ?", [(key,) for key, url in rows])
+                self.db.execute("COMMIT")
+            urls = [url for key, url in rows if keep is None or keep(url)]
+            if len(urls) < len(rows):
+                kept = set(urls)
+                self.done(url for key, url in rows if url not in kept)
+            if urls or not rows:
+                return urls
+
+    def done(self, urls):
+        """Mark URLs finished (scraped and committed, or dead-lettered)."""
+        rows = [(_row_key(url),) for url in urls]
+        if not rows:
+            return
+        with self._lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("UPDATE frontier SET taken = 2 WHERE key = ?", rows)
+            self.db.execute("COMMIT")
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,82 @@
+import os
+import time
+
+import psutil
+
+
+class MemoryGovernor:
+    """Decides when to recycle contexts or the browser, from real memory use.
+
+    RSS is summed over the whole process tree (this process plus the Playwright
+    driver and every Chromium renderer), which is where memory actually grows.
+    Samples are cached for `sample_interval` seconds and psutil Process objects
+    are reused across samples, so asking on every URL stays cheap.
+
+    - a context is recycled after `context_pages` pages, or once the tree is
+      above `soft_limit_mb` and the context has served `memory_min_pages`
+      pages (so a tree that stays above the limit does not cost a fresh
+      context on every page)
+    - the browser is relaunched once the tree is above `hard_limit_mb`
+    """
+
+    def __init__(self, soft_limit_mb=0, hard_limit_mb=0, context_pages=20, sample_interval=5.0,
+                 memory_min_pages=5):
+        self.soft_limit_mb = soft_limit_mb
+        self.hard_limit_mb = hard_limit_mb or soft_limit_mb * 1.5
+        self.context_pages = context_pages
+        self.memory_min_pages = min(memory_min_pages, context_pages) if context_pages else memory_min_pages
+        self.sample_interval = sample_interval
+        self.process = psutil.Process(os.getpid())
+        self._children = {}
+        self._sampled_at = 0.0
+        self._tree_mb = 0.0
+        self._self_mb = 0.0
+
+    def _sample(self):
+        now = time.monotonic()
+        if now - self._sampled_at < self.sample_interval:
+            return
+        self._sampled_at = now
+        self._self_mb = self.process.memory_info().rss / (1024 * 1024)
+        total = self._self_mb
+        live = {}
+        try:
+            children = self.process.children(recursive=True)
+        except psutil.Error:
+            children = []
+        for child in children:
+            # Keep the Process object we already hold for a known pid
+            proc = self._children.get(child.pid, child)
+            try:
+                total += proc.memory_info().rss / (1024 * 1024)
+            except psutil.Error:
+                continue
+            live[child.pid] = proc
+        self._children = live
+        self._tree_mb = total
+
+    def invalidate(self):
+        """Force a fresh sample after something was recycled."""
+        self._sampled_at = 0.0
+
+    def tree_mb(self):
+        self._sample()
+        return self._tree_mb
+
+    def self_mb(self):
+        self._sample()
+        return self._self_mb
+
+    def context_due(self, pages):
+        """Why this worker's context should be recycled, or None."""
+        if self.context_pages and pages >= self.context_pages:
+            return f"{pages} pages on context"
+        if self.soft_limit_mb and pages >= self.memory_min_pages and self.tree_mb() > self.soft_limit_mb:
+            return f"process tree at {self._tree_mb:.0f}MB > {self.soft_limit_mb}MB"
+        return None
+
+    def browser_due(self):
+        """Why the browser should be relaunched, or None."""
+        if self.hard_limit_mb and self.tree_mb() > self.hard_limit_mb:
+            return f"process tree at {self._tree_mb:.0f}MB > {self.hard_limit_mb:.0f}MB"
+        return None
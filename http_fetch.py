@@ -0,0 +1,62 @@
+import importlib.util
+import random
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# httpx only speaks HTTP/2 with h2 installed
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+
+
+class HttpFetcher:
+    """Pooled async HTTP client for profile pages.
+
+    One httpx client is shared by every worker, so connections are kept
+    alive and reused (multiplexed over HTTP/2 when `h2` is installed)
+    instead of paying a browser navigation per profile. Each request picks
+    one of `user_agents`, like a fresh browser context would. The cookie
+    jar accepts no domain, so no cookie is stored or sent back and nothing
+    follows us from profile to profile, whichever worker sends the request.
+    """
+
+    def __init__(self, user_agents, accept_language, max_connections=10, timeout=20.0):
+        if httpx is None:
+            raise RuntimeError("--fetch-mode http needs httpx (pip install 'httpx[http2]')")
+        self.user_agents = user_agents
+        self.client = httpx.AsyncClient(
+            http2=HTTP2,
+            follow_redirects=True,
+            cookies=CookieJar(DefaultCookiePolicy(allowed_domains=[])),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={
+                "Accept": ACCEPT,
+                "Accept-Language": accept_language,
+                "Upgrade-Insecure-Requests": "1",
+            },
+        )
+
+    async def fetch(self, url, referer=None, validators=None):
+        """GET `url`; returns (status, headers, html).
+
+        `validators` is (etag, last_modified) from an earlier fetch, sent as
+        a conditional request: the server may answer 304 with no body.
+        """
+        headers = {"User-Agent": random.choice(self.user_agents)}
+        if referer:
+            headers["Referer"] = referer
+        etag, last_modified = validators or (None, None)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = await self.client.get(url, headers=headers)
+        return response.status_code, response.headers, response.text
+
+    async def close(self):
+        await self.client.aclose()
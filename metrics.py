@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, float("inf"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus a window of recent samples for quantiles."""
+
+    def __init__(self, window=2048):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self):
+        if not self.recent:
+            return {}
+        ordered = sorted(self.recent)
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class Metrics:
+    """Per-stage timers and outcome counters for the scrape loop.
+
+    Stages are timed with `with METRICS.timer("goto"):`; counters with
+    `METRICS.count("outcome", "success")`. Safe to use from the sink and
+    archive threads. Read out as Prometheus text or a JSON snapshot.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+        # Set by the --profile mode to also record every timed stage as a span
+        self.tracer = None
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(stage, elapsed)
+            if self.tracer:
+                self.tracer.complete(stage, started, elapsed)
+
+    def count(self, name, label, n=1):
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, hist in self.stages.items():
+                q = hist.quantiles()
+                stages[stage] = {
+                    "count": hist.count,
+                    "total_s": round(hist.sum, 3),
+                    **{f"p{int(k * 100)}_s": round(v, 4) for k, v in q.items()},
+                }
+            counters = {}
+            for (name, label), value in self.counters.items():
+                counters.setdefault(name, {})[label] = value
+        return {
+            "updated": time.time(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "gauges": dict(self.gauges),
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            lines.append("# TYPE scraper_stage_seconds histogram")
+            for stage, hist in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'scraper_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {hist.sum:.6f}')
+                lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+            lines.append("# TYPE scraper_stage_recent_seconds gauge")
+            for stage, hist in sorted(self.stages.items()):
+                for q, value in hist.quantiles().items():
+                    lines.append(f'scraper_stage_recent_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE scraper_{name}_total counter")
+                for (n, label), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f'scraper_{name}_total{{{name}="{label}"}} {value}')
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE scraper_{name} gauge")
+            lines.append(f"scraper_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        rows = []
+        for stage, data in sorted(self.snapshot()["stages"].items()):
+            rows.append(f"  {stage:<12} n={data['count']:<6} total={data['total_s']:.1f}s "
+                        f"p50={data.get('p50_s', 0) * 1000:.0f}ms p95={data.get('p95_s', 0) * 1000:.0f}ms "
+                        f"p99={data.get('p99_s', 0) * 1000:.0f}ms")
+        return "\n".join(rows)
+
+
+METRICS = Metrics()
+
+
+async def serve_metrics(port, host='127.0.0.1', metrics=METRICS):
+    """Minimal HTTP endpoint answering every request with Prometheus text."""
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        body = metrics.prometheus().encode('utf-8')
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, host, port)
+
+async def flush_stats_periodically(path, interval, metrics=METRICS):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(metrics.write_json, path)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Shared request budget for every worker talking to PitchBook.
+
+    `rate` is the sustained number of requests per second across the whole
+    process and `burst` how many may go out back to back after an idle spell.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # The lock keeps waiters in FIFO order so no worker starves
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Hold back every worker for `seconds` (used for the long naps)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RateController:
+    """AIMD pacing on top of a TokenBucket, driven by how PitchBook responds.
+
+    Every navigation reports its latency and status (or an error class):
+
+    - 429/503 halve the rate at once and honour Retry-After by pausing the bucket
+    - an error rate above `error_threshold` over the last `window` requests,
+      or latency above `target_latency`, cuts the rate (at most once per
+      `cooldown` seconds, so one bad burst is not punished repeatedly)
+    - every `window // 2` healthy responses add `increase` req/s
+
+    The rate stays within [min_rate, max_rate] and every change is printed
+    with its reason. With adaptive=False the rate is fixed but Retry-After is
+    still honoured.
+    """
+
+    def __init__(self, bucket, min_rate, max_rate, adaptive=True, increase=0.02,
+                 target_latency=8.0, window=20, error_threshold=0.3, cooldown=10.0):
+        self.bucket = bucket
+        self.min_rate = min(min_rate, max_rate)
+        self.max_rate = max_rate
+        self.adaptive = adaptive
+        # The starting rate obeys the same bounds as every later change
+        bucket.rate = min(self.max_rate, max(self.min_rate, bucket.rate))
+        self.increase = increase
+        self.target_latency = target_latency
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.recent = deque(maxlen=window)
+        self.healthy_streak = 0
+        self.last_decrease = 0.0
+        self.changes = 0
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _set_rate(self, rate, reason):
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        if abs(rate - self.bucket.rate) < 1e-6:
+            return
+        print(f"\n[pacing] {self.bucket.rate:.3f} -> {rate:.3f} req/s: {reason}")
+        self.bucket.rate = rate
+        self.changes += 1
+
+    def _decrease(self, factor, reason, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.healthy_streak = 0
+        self._set_rate(self.bucket.rate * factor, reason)
+
+    def observe(self, latency=None, status=None, retry_after=None, error=None):
+        if status in (429, 503):
+            self.recent.append(False)
+            wait = parse_retry_after(retry_after)
+            if wait:
+                print(f"\n[pacing] HTTP {status}, pausing {wait:.0f}s for Retry-After")
+                self.bucket.pause(wait)
+            if self.adaptive:
+                self._decrease(0.5, f"HTTP {status}", force=True)
+            return
+        self.recent.append(error is None)
+        if not self.adaptive:
+            return
+        error_rate = self.recent.count(False) / len(self.recent)
+        if error is not None:
+            if len(self.recent) >= 5 and error_rate > self.error_threshold:
+                self._decrease(0.7, f"error rate {error_rate:.0%} ({error})")
+        elif latency is not None and latency > self.target_latency:
+            self._decrease(0.85, f"latency {latency:.1f}s > {self.target_latency:.1f}s")
+        else:
+            self.healthy_streak += 1
+            if self.healthy_streak >= max(1, self.recent.maxlen // 2):
+                self.healthy_streak = 0
+                self._set_rate(self.bucket.rate + self.increase,
+                               f"healthy (error rate {error_rate:.0%}, latency {latency or 0:.1f}s)")
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+from extractor import extract_company
+
+
+def _extract(html, url, want_links=False):
+    links = [] if want_links else None
+    try:
+        return extract_company(html, url, links), links
+    except Exception:
+        return None, links
+
+
+def _init_worker():
+    # Forked after the crawl installed its SIGTERM drain handler, which
+    # does nothing without the event loop; a signal should just end us
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+
+class ParseStage:
+    """Pipeline stage that turns raw page HTML into records in worker processes.
+
+    Fetchers hand pages over with `parse()`. Pages wait on a bounded queue
+    that `workers` consumer tasks drain into a ProcessPoolExecutor, so parsing
+    never runs on the event loop, several pages parse at once on different
+    cores, and a fetcher blocks on a full queue instead of piling up HTML in
+    memory when parsing falls behind. With `links`, the profile links on
+    each page are collected in the same parse.
+    """
+
+    def __init__(self, workers=None, max_pending=None, links=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.links = links
+        self.queue = asyncio.Queue(maxsize=max_pending or self.workers * 2)
+        self.pool = None
+        self.consumers = []
+
+    async def start(self):
+        # Processes are only forked once the first page arrives
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self.consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            html, url, future = await self.queue.get()
+            try:
+                parsed = await loop.run_in_executor(self.pool, _extract, html, url, self.links)
+            except Exception:
+                parsed = (None, None)
+            if not future.done():
+                future.set_result(parsed)
+
+    async def parse(self, html, url):
+        """Queue a page for parsing; returns (record or None, profile hrefs or None)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((html, url, future))
+        return await future
+
+    async def close(self):
+        for task in self.consumers:
+            task.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from metrics import METRICS
+
+PROFILE_DIR = 'profile'
+# Timeline lane and URL that spans recorded by the current task belong to
+LANE = contextvars.ContextVar('trace_lane', default=None)
+CURRENT_URL = contextvars.ContextVar('trace_url', default=None)
+LOOP_LANE = 'event loop'
+
+
+class TraceWriter:
+    """Chrome trace-event JSON, streamed to disk as spans finish.
+
+    Uses the JSON array format, which Perfetto and chrome://tracing load
+    even if the run dies before the closing bracket. Each worker gets its
+    own lane (from LANE), threads fall back to their name, and every span
+    carries the URL being scraped when there is one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self._lanes = {}
+        self._lock = threading.Lock()
+        self._f = open(path, 'w', encoding='utf-8')
+        self._f.write('[\n')
+
+    def _write(self, event, lane):
+        lane = lane or LANE.get() or threading.current_thread().name
+        with self._lock:
+            tid = self._lanes.get(lane)
+            if tid is None:
+                tid = self._lanes[lane] = len(self._lanes) + 1
+                self._f.write(json.dumps({"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid,
+                                          "args": {"name": lane}}) + ',\n')
+            event["pid"], event["tid"] = self.pid, tid
+            self._f.write(json.dumps(event, ensure_ascii=False) + ',\n')
+
+    def complete(self, name, started, seconds, lane=None, **args):
+        """A finished span; `started` is a time.perf_counter() reading."""
+        url = CURRENT_URL.get()
+        if url:
+            args.setdefault("url", url)
+        self._write({"ph": "X", "name": name, "ts": round((started - self.origin) * 1e6, 1),
+                     "dur": round(seconds * 1e6, 1), "args": args}, lane)
+
+    def instant(self, name, lane=None, **args):
+        self._write({"ph": "i", "s": "t", "name": name,
+                     "ts": round((time.perf_counter() - self.origin) * 1e6, 1), "args": args}, lane)
+
+    def close(self):
+        with self._lock:
+            self._f.write(json.dumps({"ph": "M", "name": "process_name", "pid": self.pid,
+                                      "args": {"name": "scraper"}}) + '\n]\n')
+            self._f.close()
+
+
+class LoopSampler:
+    """Samples the event-loop thread's Python stack from a background thread.
+
+    Stacks are aggregated as folded lines (`a;b;c count`), the input of
+    flamegraph.pl and speedscope. A sample whose innermost frame is the
+    selector wait is the loop idling; anything else is the loop busy.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='loop-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            if frame.f_code.co_name == 'select' and frame.f_code.co_filename.endswith('selectors.py'):
+                self.idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, n=15):
+        """Innermost frames of the busy samples, most frequent first."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+def describe_handle(handle):
+    callback = handle._callback
+    task = getattr(callback, '__self__', None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return f"{task.get_name()} {getattr(coro, '__qualname__', coro)}"
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+class Profiler:
+    """The --profile mode: span trace, event-loop stack sampler, lag and slow-callback monitors.
+
+    Stage timers feed the trace through METRICS.tracer, which is None
+    unless profiling, so a normal run pays one attribute check per stage.
+    """
+
+    def __init__(self, out_dir=PROFILE_DIR, sample_interval=0.005, lag_threshold=0.1, lag_interval=0.05):
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        self.lag_threshold = lag_threshold
+        self.lag_interval = lag_interval
+        self.tracer = None
+        self.sampler = None
+        self.slow = Counter()
+        self.lags = 0
+        self._lag_task = None
+        self._handle_run = None
+
+    def start(self):
+        """Call from the event loop's thread."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.tracer = TraceWriter(os.path.join(self.out_dir, 'trace.json'))
+        METRICS.tracer = self.tracer
+        self.sampler = LoopSampler(self.sample_interval)
+        self.sampler.start()
+        self._watch_callbacks()
+        self._lag_task = asyncio.create_task(self._watch_lag())
+
+    def _watch_callbacks(self):
+        # What asyncio's debug mode does for slow_callback_duration, without
+        # the rest of debug mode's overhead
+        original = self._handle_run = asyncio.events.Handle._run
+        threshold, tracer, slow = self.lag_threshold, self.tracer, self.slow
+
+        def _run(handle):
+            started = time.perf_counter()
+            original(handle)
+            elapsed = time.perf_counter() - started
+            if elapsed >= threshold:
+                name = describe_handle(handle)
+                slow[name] += 1
+                tracer.complete("slow_callback", started, elapsed, lane=LOOP_LANE, callback=name)
+        asyncio.events.Handle._run = _run
+
+    async def _watch_lag(self):
+        """A heartbeat on the loop; waking late means something held the loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            METRICS.observe("loop_lag", lag)
+            if lag >= self.lag_threshold:
+                self.lags += 1
+                self.tracer.instant("loop_lag", lane=LOOP_LANE, lag_ms=round(lag * 1000, 1))
+
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+        if self._handle_run:
+            asyncio.events.Handle._run = self._handle_run
+        self.sampler.stop()
+        METRICS.tracer = None
+        self.tracer.close()
+        self.sampler.write_folded(os.path.join(self.out_dir, 'loop_stacks.folded'))
+        self.report()
+
+    def report(self):
+        sampler = self.sampler
+        busy = sampler.samples - sampler.idle
+        print(f"\nProfile written to {self.out_dir}/ (trace.json: open in https://ui.perfetto.dev; "
+              f"loop_stacks.folded: flamegraph.pl or speedscope)")
+        if sampler.samples:
+            print(f"Event loop busy in {busy}/{sampler.samples} samples ({busy / sampler.samples:.1%})")
+        for frame, count in sampler.top_functions(10):
+            print(f"  {count:>6}  {frame}")
+        print(f"Loop lag over {self.lag_threshold * 1000:.0f}ms: {self.lags} times; slow callbacks: {sum(self.slow.values())}")
+        for name, count in self.slow.most_common(10):
+            print(f"  {count:>6}  {name}")
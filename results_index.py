@@ -0,0 +1,177 @@
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+
+from done_index import url_key
+
+COMPACT_FILE = 'results.compact.json'
+INDEX_MAGIC = b'PBRIDX01'
+# Magic, then the number of records in the segment
+HEADER = struct.Struct('<8sQ')
+# Sort entry: key, input file number, byte offset, line length
+ENTRY = struct.Struct('<QQQQ')
+COMPANY_ID = re.compile(r'^(\d{1,16})-(\d\d)$')
+
+
+def lookup_key(value):
+    """Index key for a profile URL or a bare company ID such as '12345-67'."""
+    match = COMPANY_ID.match(value.strip())
+    if match:
+        return int(match.group(1)) * 100 + int(match.group(2))
+    return url_key(value.strip())
+
+def _scan(inputs):
+    """(key, file number, offset, length) for every complete record line, in file order."""
+    for n, path in enumerate(inputs):
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                length = len(line)
+                if line.endswith(b'\n'):
+                    try:
+                        url = json.loads(line).get('url')
+                    except ValueError:
+                        url = None
+                    if url:
+                        yield url_key(url), n, offset, length
+                offset += length
+
+def _write_run(entries, tmp_dir):
+    entries.sort()
+    f = tempfile.TemporaryFile(dir=tmp_dir)
+    for entry in entries:
+        f.write(ENTRY.pack(*entry))
+    f.seek(0)
+    return f
+
+def _read_run(f, block=4096):
+    while True:
+        data = f.read(ENTRY.size * block)
+        if not data:
+            return
+        yield from ENTRY.iter_unpack(data)
+
+def _latest(merged):
+    """The last entry of each run of equal keys: the newest record for that key."""
+    previous = None
+    for entry in merged:
+        if previous is not None and entry[0] != previous[0]:
+            yield previous
+        previous = entry
+    if previous is not None:
+        yield previous
+
+def compact_results(inputs, output=COMPACT_FILE, run_size=200000):
+    """Write the newest record per URL from `inputs`, sorted by key, plus `<output>.idx`.
+
+    Later lines win, and with several inputs (e.g. shard files) later files
+    win. Memory stays bounded by `run_size`: keys and offsets are sorted in
+    runs spilled to temporary files, then merged, and only the winning
+    lines are copied from the inputs.
+    """
+    start_time = time.time()
+    tmp_dir = os.path.dirname(os.path.abspath(output))
+    runs = []
+    entries = []
+    scanned = 0
+    try:
+        for entry in _scan(inputs):
+            entries.append(entry)
+            scanned += 1
+            if len(entries) >= run_size:
+                runs.append(_write_run(entries, tmp_dir))
+                entries = []
+        runs.append(_write_run(entries, tmp_dir))
+        entries = None
+
+        sources = [open(path, 'rb') for path in inputs]
+        keys = array('Q')
+        offsets = array('Q')
+        written = 0
+        tmp_path = output + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as out:
+                for key, n, offset, length in _latest(heapq.merge(*(_read_run(run) for run in runs))):
+                    source = sources[n]
+                    source.seek(offset)
+                    keys.append(key)
+                    offsets.append(written)
+                    written += out.write(source.read(length))
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            for source in sources:
+                source.close()
+    finally:
+        for run in runs:
+            run.close()
+    # Offsets get an end sentinel, so record i spans offsets[i]:offsets[i + 1]
+    offsets.append(written)
+    index_tmp = output + '.idx.tmp'
+    with open(index_tmp, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, len(keys)))
+        keys.tofile(f)
+        offsets.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output)
+    os.replace(index_tmp, output + '.idx')
+    elapsed = time.time() - start_time
+    print(f"Compacted {scanned} records into {len(keys)} in {output} in {elapsed:.1f}s")
+    return len(keys)
+
+
+class ResultsIndex:
+    """Read-only lookups into a compacted results segment.
+
+    The index file is mapped into memory: a sorted uint64 key array and
+    the matching byte offsets. A lookup is a binary search plus one read,
+    so it costs O(log n) whatever the size of the segment.
+    """
+
+    def __init__(self, path=COMPACT_FILE):
+        self.path = path
+        self._data = open(path, 'rb')
+        with open(path + '.idx', 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header)[0] != INDEX_MAGIC:
+                self._data.close()
+                raise ValueError(f"{path}.idx is not a results index")
+            count = HEADER.unpack(header)[1]
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        self._view = view
+        self.keys = view[HEADER.size:HEADER.size + count * 8].cast('Q')
+        self.offsets = view[HEADER.size + count * 8:HEADER.size + (2 * count + 1) * 8].cast('Q')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, value):
+        """The record for a profile URL or company ID, or None."""
+        key = lookup_key(value)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        self._data.seek(self.offsets[i])
+        return json.loads(self._data.read(self.offsets[i + 1] - self.offsets[i]))
+
+    def close(self):
+        self.keys.release()
+        self.offsets.release()
+        self._view.release()
+        self._map.close()
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+FSYNC_POLICIES = ('none', 'batch', 'record')
+
+
+class ResultsSink:
+    """Batched writer for results.json and its checkpoint journal.
+
+    Records are buffered on the event loop and committed in batches from a
+    single background thread, so the loop never blocks on disk. A batch is
+    committed in a fixed order: result lines first, then their journal
+    entries, then the results offset in `<results>.commit`. On startup,
+    `recover()` replays any result lines past that offset into the journal,
+    so a crash can never leave a profile in results.json that is not marked
+    done, and a URL is only marked done once its result is on disk.
+    `on_commit`, if given, receives the per-URL metadata of each batch once
+    it is durable, and `exporter` (a ColumnarWriter) its new records.
+    """
+
+    def __init__(self, results_path, journal, batch_size=50, flush_interval=5.0, fsync='batch',
+                 on_commit=None, exporter=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.results_path = results_path
+        self.commit_path = results_path + '.commit'
+        self.journal = journal
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.on_commit = on_commit
+        self.exporter = exporter
+        self.pending = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results-sink')
+        self._timer = None
+        self._f = None
+
+    def recover(self):
+        """Bring the journal in line with results.json after an unclean stop."""
+        size = os.path.getsize(self.results_path) if os.path.exists(self.results_path) else 0
+        offset = self._read_commit_offset()
+        if offset is None:
+            # First run with a sink: whatever is already there predates it
+            self._write_commit_offset(size)
+            return 0
+        recovered = 0
+        if size > offset:
+            with open(self.results_path, 'r+b') as f:
+                f.seek(offset)
+                tail = f.read()
+                end = tail.rfind(b'\n') + 1
+                if end < len(tail):
+                    f.truncate(offset + end)
+            for line in tail[:end].splitlines():
+                try:
+                    url = json.loads(line).get('url')
+                except ValueError:
+                    continue
+                if url and url not in self.journal:
+                    self.journal.add(url)
+                    recovered += 1
+            self.journal.flush(fsync=self.fsync != 'none')
+            self._write_commit_offset(offset + end)
+        elif size < offset:
+            self._write_commit_offset(size)
+        if recovered:
+            print(f"Recovered {recovered} results missing from the checkpoint")
+        return recovered
+
+    def _read_commit_offset(self):
+        try:
+            with open(self.commit_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _write_commit_offset(self, offset):
+        tmp_path = self.commit_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.commit_path)
+
+    async def start(self):
+        self._f = open(self.results_path, 'ab')
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def add(self, url, record=None, meta=None):
+        """Queue `url` as done; `record` is None for pages with nothing to save (404s, unchanged)."""
+        self.pending.append((url, record, meta))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._commit, batch)
+
+    def _commit(self, batch):
+        with METRICS.timer("commit"):
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        for url, record, meta in batch:
+            if record is not None:
+                self._f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                if self.fsync == 'record':
+                    self._f.flush()
+                    os.fsync(self._f.fileno())
+        self._f.flush()
+        if self.fsync == 'batch':
+            os.fsync(self._f.fileno())
+        for url, record, meta in batch:
+            self.journal.add(url)
+        self.journal.flush(fsync=self.fsync != 'none')
+        self._write_commit_offset(self._f.tell())
+        if self.on_commit:
+            self.on_commit([meta for url, record, meta in batch if meta])
+        if self.exporter:
+            self.exporter.write([record for url, record, meta in batch if record is not None])
+
+    async def close(self):
+        if self._timer:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+        await self.flush()
+        self._executor.shutdown(wait=True)
+        if self._f:
+            self._f.close()
+        if self.exporter:
+            self.exporter.close()
@@ -0,0 +1,134 @@
+import heapq
+import json
+import os
+import random
+import time
+
+RETRY_QUEUE_FILE = 'retry_queue.json'
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+
+
+class RetryQueue:
+    """Failed URLs waiting for another attempt, earliest due first.
+
+    Each failure pushes the URL back with exponential backoff and jitter
+    (`base_delay * 2**(attempts-1)`, capped at `max_delay`, times 0.5-1.5),
+    so the main stream keeps flowing while a URL waits. After `budget`
+    attempts the URL goes to the dead-letter JSONL file with its last error
+    class and timing instead. Pending retries are snapshotted to
+    `path` so they survive a restart.
+    """
+
+    def __init__(self, path=RETRY_QUEUE_FILE, dead_letter_path=DEAD_LETTER_FILE,
+                 budget=5, base_delay=30.0, max_delay=1800.0, save_interval=30.0):
+        self.path = path
+        self.dead_letter_path = dead_letter_path
+        self.budget = budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.save_interval = save_interval
+        self.heap = []
+        self.entries = {}
+        self.dead = set()
+        self.dead_lettered = 0
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def __contains__(self, url):
+        return url in self.entries or url in self.dead
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        now = time.time()
+        for entry in self.entries.values():
+            # Retries that were in flight when we stopped are due straight away
+            entry["due"] = entry.get("due") or now
+        self.heap = [(entry["due"], url) for url, entry in self.entries.items()]
+        heapq.heapify(self.heap)
+        if os.path.exists(self.dead_letter_path):
+            with open(self.dead_letter_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.dead.add(json.loads(line)["url"])
+                    except (ValueError, KeyError):
+                        continue
+        return self
+
+    def schedule(self, url, error):
+        """Record a failed attempt. Returns False once the URL is dead-lettered."""
+        now = time.time()
+        entry = self.entries.get(url) or {"attempts": 0, "first_failed": now}
+        entry["attempts"] += 1
+        entry["last_error"] = error
+        entry["last_failed"] = now
+        self._dirty = True
+        if entry["attempts"] >= self.budget:
+            self.entries.pop(url, None)
+            self._dead_letter(url, entry)
+            return False
+        delay = min(self.max_delay, self.base_delay * 2 ** (entry["attempts"] - 1))
+        entry["due"] = now + delay * random.uniform(0.5, 1.5)
+        self.entries[url] = entry
+        heapq.heappush(self.heap, (entry["due"], url))
+        return True
+
+    def _dead_letter(self, url, entry):
+        record = {
+            "url": url,
+            "attempts": entry["attempts"],
+            "last_error": entry["last_error"],
+            "first_failed": entry["first_failed"],
+            "last_failed": entry["last_failed"],
+        }
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self.dead.add(url)
+        self.dead_lettered += 1
+
+    def attempts(self, url):
+        entry = self.entries.get(url)
+        return entry["attempts"] if entry else 0
+
+    def pop_due(self):
+        """Next URL whose backoff has expired, or None."""
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            due, url = heapq.heappop(self.heap)
+            entry = self.entries.get(url)
+            # Skip heap items made stale by a later reschedule
+            if entry is not None and entry.get("due") == due:
+                entry["due"] = None
+                return url
+        return None
+
+    def next_due_in(self):
+        """Seconds until the next retry is due (None if nothing is waiting)."""
+        while self.heap:
+            due, url = self.heap[0]
+            if self.entries.get(url, {}).get("due") == due:
+                return max(0.0, due - time.time())
+            heapq.heappop(self.heap)
+        return None
+
+    def done(self, url):
+        if self.entries.pop(url, None) is not None:
+            self._dirty = True
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if not self._dirty or (not force and now - self._saved_at < self.save_interval):
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._saved_at = now
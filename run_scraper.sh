@@ -1,13 +1,19 @@
 #!/bin/bash
 
+# Thin wrapper around `scraper.py supervise` / `scraper.py status`.
+# Extra arguments to start/monitor/status are passed on to the scraper, e.g.
+#   ./run_scraper.sh monitor --concurrency 4
+#   ./run_scraper.sh status --status-file scraper_status.shard0of4.json
+
 # Configuration
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 SCRAPER_SCRIPT="$SCRIPT_DIR/scraper.py"
 VENV_PATH="$SCRIPT_DIR/.venv"
 LOG_FILE="$SCRIPT_DIR/scraper.log"
 URL_LIST_FILE="$SCRIPT_DIR/url_list.json"
-SCRAPED_LINKS_FILE="$SCRIPT_DIR/scraped_links.json"
-PID_FILE="$SCRIPT_DIR/scraper.pid"
+PID_FILE="$SCRIPT_DIR/supervisor.pid"
+# Seconds the scraper gets to finish in-flight URLs and flush results on stop
+DRAIN_TIMEOUT=120
 
 # Colors for output
 RED='\033[0;31m'
@@ -15,13 +21,16 @@ GREEN='\033[0;32m'
 YELLOW='\033[1;33m'
 NC='\033[0m' # No Color
 
+# The scraper and supervisor use paths relative to the project directory
+cd "$SCRIPT_DIR" || exit 1
+
 # Function to log messages
 log_message() {
     echo -e "$(date '+%Y-%m-%d %H:%M:%S') - $1" | tee -a "$LOG_FILE"
 }
 
-# Function to check if scraper is running
-is_scraper_running() {
+# Function to check if the supervisor is running
+is_supervisor_running() {
     if [ -f "$PID_FILE" ]; then
         local pid=$(cat "$PID_FILE")
         if ps -p "$pid" > /dev/null 2>&1; then
@@ -33,40 +42,8 @@ is_scraper_running() {
     return 1  # Not running
 }
 
-# Function to count total URLs
-count_total_urls() {
-    if [ -f "$URL_LIST_FILE" ]; then
-        python3 -c "import json; print(len(json.load(open('$URL_LIST_FILE'))))" 2>/dev/null || echo "0"
-    else
-        echo "0"
-    fi
-}
-
-# Function to count scraped URLs
-count_scraped_urls() {
-    if [ -f "$SCRAPED_LINKS_FILE" ]; then
-        python3 -c "import json; print(len(json.load(open('$SCRAPED_LINKS_FILE'))))" 2>/dev/null || echo "0"
-    else
-        echo "0"
-    fi
-}
-
-# Function to check if scraping is complete
-is_scraping_complete() {
-    local total=$(count_total_urls)
-    local scraped=$(count_scraped_urls)
-    
-    if [ "$total" -gt 0 ] && [ "$scraped" -ge "$total" ]; then
-        return 0  # Complete
-    else
-        return 1  # Not complete
-    fi
-}
-
-# Function to start scraper
-start_scraper() {
-    log_message "${GREEN}Starting scraper...${NC}"
-    
+# Function to check the environment before launching
+prepare() {
     # Activate virtual environment
     if [ -d "$VENV_PATH" ]; then
         source "$VENV_PATH/bin/activate"
@@ -86,90 +63,45 @@ start_scraper() {
         log_message "${RED}URL list file not found: $URL_LIST_FILE${NC}"
         return 1
     fi
-    
-    # Start scraper in background
-    nohup python3 "$SCRAPER_SCRIPT" >> "$LOG_FILE" 2>&1 &
-    local pid=$!
-    echo "$pid" > "$PID_FILE"
-    
-    log_message "Scraper started with PID: $pid"
     return 0
 }
 
-# Function to stop scraper
+# Function to start the supervisor in the background
+start_scraper() {
+    log_message "${GREEN}Starting supervisor...${NC}"
+    prepare || return 1
+    nohup python3 "$SCRAPER_SCRIPT" supervise --drain-timeout "$DRAIN_TIMEOUT" -- "$@" >> "$LOG_FILE" 2>&1 &
+    log_message "Supervisor started with PID: $!"
+    return 0
+}
+
+# Function to stop: SIGTERM lets the scraper drain and flush before exiting
 stop_scraper() {
-    if [ -f "$PID_FILE" ]; then
+    if is_supervisor_running; then
         local pid=$(cat "$PID_FILE")
+        log_message "${YELLOW}Stopping supervisor (PID: $pid), waiting for the scraper to drain...${NC}"
+        kill -TERM "$pid"
+        local waited=0
+        while ps -p "$pid" > /dev/null 2>&1 && [ "$waited" -lt $((DRAIN_TIMEOUT + 15)) ]; do
+            sleep 1
+            waited=$((waited + 1))
+        done
         if ps -p "$pid" > /dev/null 2>&1; then
-            log_message "${YELLOW}Stopping scraper (PID: $pid)...${NC}"
-            kill "$pid"
-            sleep 2
-            if ps -p "$pid" > /dev/null 2>&1; then
-                log_message "${YELLOW}Force killing scraper...${NC}"
-                kill -9 "$pid"
-            fi
+            log_message "${RED}Supervisor did not exit after ${waited}s${NC}"
+            return 1
         fi
-        rm -f "$PID_FILE"
     fi
 }
 
-# Function to show status
-show_status() {
-    local total=$(count_total_urls)
-    local scraped=$(count_scraped_urls)
-    local remaining=$((total - scraped))
-    
-    if is_scraper_running; then
-        local pid=$(cat "$PID_FILE")
-        echo -e "${GREEN}✓${NC} Running (PID: $pid) | URLs: $scraped/$total | Remaining: $remaining"
-    else
-        echo -e "${RED}✗${NC} Not running | URLs: $scraped/$total | Remaining: $remaining"
-    fi
-}
-
-# Main monitoring loop
-main() {
-    echo "Scraper Monitor Started"
-    echo "======================"
-    
-    # Handle signals
-    trap 'echo -e "\n${YELLOW}Stopping scraper...${NC}"; stop_scraper; exit 0' INT TERM
-    
-    while true; do
-        show_status
-        
-        # Check if scraping is complete
-        if is_scraping_complete; then
-            echo -e "\n${GREEN}✓ All URLs scraped! Stopping monitor.${NC}"
-            stop_scraper
-            break
-        fi
-        
-        # Check if scraper is running
-        if ! is_scraper_running; then
-            echo -e "\n${YELLOW}Starting scraper...${NC}"
-            if start_scraper; then
-                echo -e "${GREEN}✓ Started${NC}"
-            else
-                echo -e "${RED}✗ Failed to start${NC}"
-                sleep 60
-            fi
-        fi
-        
-        # Wait before next check
-        sleep 30
-    done
-    
-    echo "Monitor stopped"
-}
-
 # Handle command line arguments
-case "${1:-monitor}" in
+command="${1:-monitor}"
+shift
+case "$command" in
     "start")
-        if is_scraper_running; then
+        if is_supervisor_running; then
             log_message "${YELLOW}Scraper is already running${NC}"
         else
-            start_scraper
+            start_scraper "$@"
         fi
         ;;
     "stop")
@@ -177,17 +109,33 @@ case "${1:-monitor}" in
         log_message "Scraper stopped"
         ;;
     "status")
-        show_status
+        # Arguments (e.g. --status-file) go to the scraper; without any,
+        # every status file is shown, one per shard or worker
+        if [ $# -gt 0 ]; then
+            python3 "$SCRAPER_SCRIPT" status "$@"
+        else
+            shopt -s nullglob
+            status_files=(scraper_status*.json)
+            if [ ${#status_files[@]} -le 1 ]; then
+                python3 "$SCRAPER_SCRIPT" status
+            else
+                for status_file in "${status_files[@]}"; do
+                    echo -n "$status_file: "
+                    python3 "$SCRAPER_SCRIPT" status --status-file "$status_file"
+                done
+            fi
+        fi
         ;;
     "monitor")
-        main
+        prepare || exit 1
+        exec python3 "$SCRAPER_SCRIPT" supervise --drain-timeout "$DRAIN_TIMEOUT" -- "$@"
         ;;
     *)
-        echo "Usage: $0 {start|stop|status|monitor}"
-        echo "  start   - Start the scraper"
-        echo "  stop    - Stop the scraper"
-        echo "  status  - Show current status"
-        echo "  monitor - Run monitoring loop (default)"
+        echo "Usage: $0 {start|stop|status|monitor} [scraper options]"
+        echo "  start   - Start the supervised scraper in the background"
+        echo "  stop    - Drain and stop the scraper"
+        echo "  status  - Show current status (every scraper_status*.json, or --status-file FILE)"
+        echo "  monitor - Supervise the scraper in the foreground (default)"
         exit 1
         ;;
-esac 
\ No newline at end of file
+esac
@@ -7,15 +7,36 @@ from tqdm import tqdm
 import sys
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-import psutil
-from bs4 import BeautifulSoup, Tag
 import locale
 import asyncio
+import signal
+
+from archive import ARCHIVE_DIR, CODECS, DEFAULT_CODEC, HtmlArchive, reparse_archive
+from blocking import BLOCK_MODES, DEFAULT_BLOCK_TYPES, ResourceBlocker
+from checkpoint import CheckpointJournal
+from columnar_export import EXPORT_FORMATS, EXTENSIONS, ROW_GROUP_SIZE, ColumnarWriter, export_results
+from extractor import BROWSER_EXTRACT_JS, CLOUDFLARE_PHRASES, inspect_html
+from freshness import FRESHNESS_FILE, RECRAWL_ORDERS, FreshnessStore
+from frontier import FRONTIER_FILE, Frontier
+from governor import MemoryGovernor
+from http_fetch import HttpFetcher
+from metrics import METRICS, flush_stats_periodically, serve_metrics
+from pacing import RateController, TokenBucket
+from profiling import CURRENT_URL, LANE, PROFILE_DIR, Profiler
+from parse_stage import ParseStage
+from results_index import COMPACT_FILE, ResultsIndex, compact_results
+from results_sink import FSYNC_POLICIES, ResultsSink
+from retry_queue import DEAD_LETTER_FILE, RETRY_QUEUE_FILE, RetryQueue
+from supervisor import STATUS_FILE, Supervisor, show_status, write_status
+from url_source import chunk_reader, count_urls, iter_urls
+from work_store import SqliteWorkStore, default_worker_id, in_shard, parse_shard
 
 # File configurations
 RESULTS_FILE = 'results.json'
-SCRAPED_LINKS_FILE = 'scraped_links.json'
+SCRAPED_LINKS_FILE = 'scraped_links.log'
+LEGACY_SCRAPED_LINKS_FILE = 'scraped_links.json'
 URL_LIST_FILE = 'url_list.json'
+STATS_FILE = 'scraper_stats.json'
 
 # Enhanced fingerprinting configurations - Desktop only to maintain extraction logic
 USER_AGENTS = [
@@ -51,12 +72,6 @@ BROWSER_ARGS = [
 ]
 
 
-CLOUDFLARE_PHRASES = [
-    "Just a moment", "Checking your browser", "Ray ID",
-    "Verifying you are human", "/cdn-cgi/challenge-platform/",
-    "Cloudflare Security"
-]
-
 # Enhanced stealth script with more fingerprint obfuscation
 STEALTH_JS = '''
 (() => {
@@ -187,32 +202,19 @@ REFERERS = [
     "https://search.brave.com/",
 ]
 
-def safe_text(tag):
-    return tag.get_text(strip=True) if tag else None
-
 def detect_locale_and_tz():
     # Hardcoded for Mumbai, India
     locale_str = 'en-IN'
     tz_id = 'Asia/Kolkata'
     return locale_str, tz_id
 
-async def block_resources(route, request):
-    resource_types = [
-        "stylesheet", "image", "font", "media", "other"
-    ]
-    if request.resource_type in resource_types:
-        await route.abort()
-    else:
-        await route.continue_()
-
-async def create_browser_session(headless, js_enabled=True):
-    playwright = await async_playwright().start()
-    # Force Indian user agent and large window size
-    width, height = 1920, 1080
-    user_agent = random.choice(USER_AGENTS)
-    accept_language = "en-IN,en;q=0.9,hi-IN;q=0.8"
+# Force Indian locale and large window size
+WINDOW_SIZE = (1920, 1080)
+ACCEPT_LANGUAGE = "en-IN,en;q=0.9,hi-IN;q=0.8"
 
-    # Add more browser launch arguments
+async def launch_browser(playwright, headless):
+    width, height = WINDOW_SIZE
+    # Add more browser launch arguments; the user agent is set per context
     args = BROWSER_ARGS + [
         f'--window-size={width},{height}',
         '--disable-3d-apis',
@@ -226,15 +228,17 @@ async def create_browser_session(headless, js_enabled=True):
         '--metrics-recording-only',
         '--no-default-browser-check',
         '--no-first-run',
-        f'--user-agent={user_agent}',
         '--use-mock-keychain',
     ]
-
-    browser = await playwright.chromium.launch(
+    return await playwright.chromium.launch(
         headless=headless,
         args=args
     )
 
+async def new_stealth_context(browser, blocker, js_enabled=True):
+    """Fresh context with its own user agent, stealth scripts and resource blocking."""
+    width, height = WINDOW_SIZE
+    user_agent = random.choice(USER_AGENTS)
     locale_str, tz_id = detect_locale_and_tz()
     context = await browser.new_context(
         viewport={"width": width, "height": height},
@@ -244,7 +248,7 @@ async def create_browser_session(headless, js_enabled=True):
         locale=locale_str,
         timezone_id=tz_id,
         extra_http_headers={
-            "Accept-Language": accept_language,
+            "Accept-Language": ACCEPT_LANGUAGE,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Encoding": "gzip, deflate, br",
             "Connection": "keep-alive",
@@ -266,110 +270,147 @@ async def create_browser_session(headless, js_enabled=True):
         await context.add_init_script(stealth_code)
 
     # Block unnecessary resources
-    await context.route("**/*", block_resources)
+    await blocker.install(context)
 
-    return playwright, browser, context
+    return context
 
-async def scrape_company_from_page(page, url):
-    try:
-        html = await page.content()
-        soup = BeautifulSoup(html, "lxml")
 
-        # --- Name ---
-        name_tag = soup.find("h2", class_="XL-8 L-7 M-5 S-4 pp-overview__title mb-xl-0") if hasattr(soup, "find") else None
-        if isinstance(name_tag, Tag):
-            span = name_tag.find("span") if hasattr(name_tag, "find") else None
-            name = span.get_text(strip=True) if isinstance(span, Tag) else safe_text(name_tag)
-        else:
-            name = None
-        if not name:
-            return None
+class SessionManager:
+    """One Playwright driver and one Chromium for the whole run.
 
-        # --- Overview Items (by label) ---
-        overview_items = soup.find_all("div", class_="pp-overview-item") if hasattr(soup, "find_all") else []
-        founded = status = latest_deal_type = financing_rounds = None
-        for item in overview_items:
-            if not isinstance(item, Tag):
-                continue
-            label = item.find("li", class_="dont-break text-small") if hasattr(item, "find") else None
-            value = item.find("span", class_="pp-overview-item__title font-weight-bold d-block-XL mb-xl-0") if hasattr(item, "find") else None
-            if not (isinstance(label, Tag) and isinstance(value, Tag)):
-                continue
-            label_text = label.get_text(strip=True).lower() if hasattr(label, "get_text") else ""
-            value_text = value.get_text(strip=True) if hasattr(value, "get_text") else ""
-            if "founded" in label_text:
-                founded = value_text
-            elif "status" in label_text:
-                status = value_text
-            elif "latest deal type" in label_text:
-                latest_deal_type = value_text
-            elif "financing rounds" in label_text:
-                financing_rounds = value_text
-
-        # --- Description ---
-        description_tag = soup.find("p", class_="pp-description_text mb-xl-0") if hasattr(soup, "find") else None
-        description = safe_text(description_tag)
-
-        # --- Website ---
-        website_tag = soup.find("a", class_="d-block-XL font-underline") if hasattr(soup, "find") else None
-        website = website_tag.get("href") if isinstance(website_tag, Tag) and website_tag.has_attr("href") else None
-
-        # --- Contact Info Items (by label) ---
-        contact_info_items = soup.find_all("div", class_="pp-contact-info_item") if hasattr(soup, "find_all") else []
-        ownership_status = financing_status = primary_industry = parent_company = None
-        verticals = []
-        other_industries = []
-        for item in contact_info_items:
-            if not isinstance(item, Tag):
-                continue
-            label_div = item.find("div", class_="font-weight-bold font-color-black") if hasattr(item, "find") else None
-            if not isinstance(label_div, Tag):
-                continue
-            label_text = label_div.get_text(strip=True).lower() if hasattr(label_div, "get_text") else ""
-            value_divs = label_div.find_next_siblings("div", class_="font-weight-normal font-color-black ellipsis-XL") if hasattr(label_div, "find_next_siblings") else []
-            if "ownership status" in label_text and value_divs:
-                ownership_status = safe_text(value_divs[0])
-            elif "financing status" in label_text and value_divs:
-                financing_status = safe_text(value_divs[0])
-            elif "primary industry" in label_text and value_divs:
-                primary_industry = safe_text(value_divs[0])
-            elif "parent company" in label_text and value_divs:
-                parent_company = safe_text(value_divs[0])
-            elif "vertical" in label_text:
-                if hasattr(item, "find_all") and isinstance(item, Tag):
-                    vertical_links = item.find_all("a", class_="font-underline")
-                    for a in vertical_links:
-                        if isinstance(a, Tag):
-                            verticals.append({
-                                "name": a.get_text(strip=True) if hasattr(a, "get_text") else None,
-                                "url": a.get("href") if a.has_attr("href") else None
-                            })
-            elif "other industries" in label_text:
-                other_industries = [safe_text(div) for div in value_divs if safe_text(div)]
-
-        # --- Address ---
-        address = soup.find("ul", class_="list-type-none XL-12") if hasattr(soup, "find") else None
-        address_parts = [li.get_text(strip=True) for li in address.find_all("li") if hasattr(li, "get_text")] if isinstance(address, Tag) else []
-
-        return {
-            "name": name,
-            "url": url,
-            "founded": founded,
-            "status": status,
-            "latest_deal_type": latest_deal_type,
-            "financing_rounds": financing_rounds,
-            "description": description,
-            "website": website,
-            "ownership_status": ownership_status,
-            "financing_status": financing_status,
-            "primary_industry": primary_industry,
-            "parent_company": parent_company,
-            "address": address_parts,
-            "verticals": verticals,
-            "other_industries": other_industries
-        }
-    except Exception as e:
-        return None
+    Workers rotate fingerprints by taking fresh contexts; the browser itself
+    is only relaunched when it has crashed or fails a health check. Launch
+    and context creation times are kept so the cost of rotation is visible.
+    """
+
+    def __init__(self, headless, blocker, js_enabled=True):
+        self.headless = headless
+        self.blocker = blocker
+        self.js_enabled = js_enabled
+        self.playwright = None
+        self.browser = None
+        self.generation = 0
+        self.timings = {"browser": [], "context": []}
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        # Idempotent: a launch that failed after the driver came up is retried alone
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        await self._launch()
+
+    async def _launch(self):
+        started = time.perf_counter()
+        self.browser = await launch_browser(self.playwright, self.headless)
+        self.generation += 1
+        elapsed = time.perf_counter() - started
+        self.timings["browser"].append(elapsed)
+        print(f"\nBrowser launched in {elapsed:.2f}s (generation {self.generation})")
+
+    async def restart_browser(self, reason, generation=None):
+        """Relaunch Chromium unless another worker already did since `generation`."""
+        async with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            print(f"\nRestarting browser: {reason}")
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            try:
+                await self._launch()
+            except Exception as e:
+                # Left disconnected: the next open_page() tries the launch again
+                print(f"\nBrowser relaunch failed: {type(e).__name__}: {e}")
+
+    async def health_check(self, timeout=10):
+        """True if the browser still answers; relaunches it otherwise."""
+        generation = self.generation
+        if self.browser is not None and self.browser.is_connected():
+            try:
+                context = await asyncio.wait_for(self.browser.new_context(), timeout)
+                await context.close()
+                return True
+            except Exception:
+                pass
+        await self.restart_browser("health check failed", generation)
+        return False
+
+    async def open_page(self):
+        """A fresh (context, page); relaunches the browser once if the context can't be made."""
+        if self.browser is None:
+            # Not launched up front on the HTTP path; the first fallback does it
+            async with self._lock:
+                if self.browser is None:
+                    await self.start()
+        if not self.browser.is_connected():
+            await self.restart_browser("browser disconnected", self.generation)
+        generation = self.generation
+        try:
+            return await self._new_page()
+        except Exception as e:
+            # Usually a browser that died under us; only one worker relaunches it
+            await self.restart_browser(f"new context failed ({type(e).__name__})", generation)
+        return await self._new_page()
+
+    async def _new_page(self):
+        started = time.perf_counter()
+        context = await new_stealth_context(self.browser, self.blocker, self.js_enabled)
+        try:
+            page = await context.new_page()
+            await self.blocker.attach(page)
+        except Exception:
+            try:
+                await context.close()
+            except Exception:
+                pass
+            raise
+        self.timings["context"].append(time.perf_counter() - started)
+        return context, page
+
+    async def close_page(self, session):
+        context, page = session
+        try:
+            await page.close()
+            await context.close()
+        except Exception:
+            # The browser went away under us; open_page will relaunch it
+            pass
+
+    def timing_summary(self):
+        parts = []
+        for kind, samples in self.timings.items():
+            if samples:
+                avg = sum(samples) / len(samples)
+                parts.append(f"{kind}: {len(samples)} x {avg * 1000:.0f}ms avg, {max(samples) * 1000:.0f}ms max")
+        return "; ".join(parts)
+
+    async def close(self):
+        try:
+            if self.browser:
+                await self.browser.close()
+        finally:
+            if self.playwright:
+                await self.playwright.stop()
+
+async def inspect_page(page, url, extract_mode="browser", links=False):
+    """Take one look at the loaded page: 404/challenge/overview flags and the record.
+
+    In browser mode the extraction rules run inside the page and only the
+    small result crosses the Playwright pipe. The HTML path (serialize the DOM
+    and hand it to the parse stage) is used in html mode or if the in-page
+    call fails; its info carries the raw "html" instead of a record.
+    Profile links are collected in the page only when `links` is set.
+    """
+    if extract_mode == "browser":
+        try:
+            with METRICS.timer("evaluate"):
+                return await page.evaluate(BROWSER_EXTRACT_JS, [url, links])
+        except Exception:
+            pass
+    with METRICS.timer("content"):
+        html = await page.content()
+    return inspect_html(html)
 
 async def bypass_cloudflare(page):
     """Attempt to bypass Cloudflare protection using multiple techniques"""
@@ -435,169 +476,950 @@ async def handle_cloudflare(page, url):
     except:
         return False
 
-async def main():
-    parser = argparse.ArgumentParser(description="Advanced Stealth Playwright Scraper")
-    parser.add_argument('--headfull', action='store_true', help='Run browser in headful (visible) mode')
-    args = parser.parse_args()
-    headless = not args.headfull
-    
-    # Load URLs and filter already scraped
-    with open(URL_LIST_FILE, "r", encoding="utf-8") as f:
-        urls = json.load(f)
-    # Filter out already scraped URLs
-    scraped_urls = set()
-    if os.path.exists(SCRAPED_LINKS_FILE):
+class CrawlState:
+    """Counters and results sink shared by every worker in the pool."""
+
+    def __init__(self, sink, parse_stage, pacer, retries, total_urls, extract_mode="browser",
+                 archive=None, store=None, http=None, browser_slots=2, freshness=None, recrawl=False,
+                 frontier=None, wanted=None):
+        self.sink = sink
+        self.frontier = frontier
+        # Filter for URLs still to be scraped by this worker
+        self.wanted = wanted
+        # URLs a worker is on right now; discovery ends once none are left
+        self.active = 0
+        self.freshness = freshness
+        # Recrawls re-fetch finished URLs, so they send conditional requests
+        self.recrawl = recrawl
+        self.http = http
+        # Caps the browser pages open at once for HTTP fallbacks
+        self.browser_slots = asyncio.Semaphore(browser_slots)
+        self.store = store
+        self.finished = []
+        self.retries = retries
+        self.feed_done = False
+        self.fed = 0
+        self.draining = False
+        self.done = 0
+        self.pacer = pacer
+        self.parse_stage = parse_stage
+        self.extract_mode = extract_mode
+        self.archive = archive
+        self.total_urls = total_urls
+        self.total_known = store is not None
+        self.total_successful = 0
+        self.cloudflare_count = 0
+        self.dispatched = 0
+        self.start_time = time.time()
+
+    async def mark_scraped(self, url):
+        """Checkpoint a URL with nothing to save (a 404); a recrawl waits the full age before retrying it."""
+        await self.sink.add(url, None, self.freshness.gone(url) if self.freshness else None)
+
+    async def save_result(self, url, result, validators=None):
+        # The result and its checkpoint entry are committed in the same batch
+        self.total_successful += 1
+        if not self.freshness:
+            await self.sink.add(url, result)
+            return
+        meta = await asyncio.to_thread(self.freshness.check, url, result, validators)
+        if not meta["changed"]:
+            # Same record as last time: only its fetch time is updated
+            METRICS.count("recrawl", "unchanged")
+            await self.sink.add(url, None, meta)
+            return
+        METRICS.count("recrawl", "changed" if meta["known"] else "new")
+        await self.sink.add(url, result, meta)
+
+    async def save_not_modified(self, url, validators=None):
+        """Record a 304: the page, and so the record, is as it was last time."""
+        self.total_successful += 1
+        METRICS.count("recrawl", "not_modified")
+        await self.sink.add(url, None, self.freshness.not_modified(url, validators))
+
+    async def validators(self, url):
+        """(etag, last_modified) for a conditional re-fetch of `url`, or None."""
+        if not self.recrawl:
+            return None
+        return await asyncio.to_thread(self.freshness.validators, url)
+
+    def set_total(self, total):
+        self.total_urls = total
+        self.total_known = True
+
+    def finish(self, url, status):
+        """Queue a final outcome ('done' or 'dead') for the work store or frontier."""
+        if self.store or self.frontier:
+            self.finished.append((url, status))
+
+    async def discover(self, url, links):
+        """Push the profile links found on `url` onto the discovery frontier."""
+        if not self.frontier or not links:
+            return
+        with METRICS.timer("discover"):
+            added = await asyncio.to_thread(self.frontier.discover, url, links, self.wanted)
+        if added:
+            METRICS.count("discovered", "new", added)
+            self.total_urls += added
+
+    async def archive_page(self, url, html):
+        # Compression and disk writes stay off the event loop
+        await asyncio.to_thread(self.archive.put, url, html)
+
+
+class ChallengeNotCleared(Exception):
+    pass
+
+class ParseMiss(Exception):
+    pass
+
+class RateLimited(Exception):
+    pass
+
+def outcome_of(error):
+    """Outcome label for the metrics counters from an exception."""
+    if isinstance(error, ChallengeNotCleared):
+        return "challenge"
+    if isinstance(error, ParseMiss):
+        return "parse_miss"
+    if isinstance(error, RateLimited):
+        return "rate_limited"
+    if isinstance(error, (PlaywrightTimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    return "error"
+
+BROWSER_FALLBACK = "browser_fallback"
+
+def validators_of(headers):
+    """(etag, last_modified) from response headers, or None if the server sent neither."""
+    etag, last_modified = headers.get("etag"), headers.get("last-modified")
+    return (etag, last_modified) if etag or last_modified else None
+
+async def fetch_http(url, state, limiter):
+    """Try one URL over the pooled HTTP client.
+
+    Returns None when done, an error class name on failure, or
+    BROWSER_FALLBACK when the response lacks the profile markers (a
+    challenge, a JS-only page) or the request itself failed.
+    """
+    try:
+        with METRICS.timer("rate_wait"):
+            await limiter.acquire()
+        previous = await state.validators(url)
+        started = time.monotonic()
+        try:
+            with METRICS.timer("http_get"):
+                status, headers, html = await state.http.fetch(url, random.choice(REFERERS), previous)
+        except Exception as e:
+            state.pacer.observe(error=type(e).__name__)
+            METRICS.count("http_fallback", "error")
+            return BROWSER_FALLBACK
+        METRICS.count("http_status", str(status))
+        state.pacer.observe(latency=time.monotonic() - started, status=status,
+                            retry_after=headers.get("retry-after"))
+        if status in (429, 503):
+            # Throttled: the browser would only be throttled too, so retry later
+            raise RateLimited(f"HTTP {status}")
+        validators = validators_of(headers)
+        if status == 304 and previous:
+            with METRICS.timer("write"):
+                await state.save_not_modified(url, validators or previous)
+            METRICS.count("outcome", "success")
+            METRICS.count("fetched_by", "http")
+            return None
+        info = inspect_html(html)
+        if info["not_found"]:
+            print(f"[404] Skipping and marking as scraped: {url}")
+            METRICS.count("outcome", "not_found")
+            with METRICS.timer("write"):
+                await state.mark_scraped(url)
+            return None
+        if info["challenge"] or not info["has_title"]:
+            METRICS.count("http_fallback", "challenge" if info["challenge"] else "no_markers")
+            return BROWSER_FALLBACK
+        with METRICS.timer("parse"):
+            result, links = await state.parse_stage.parse(html, url)
+        if not result:
+            METRICS.count("http_fallback", "parse_miss")
+            return BROWSER_FALLBACK
+        if state.archive:
+            with METRICS.timer("archive"):
+                await state.archive_page(url, html)
+        with METRICS.timer("write"):
+            await state.save_result(url, result, validators)
+        await state.discover(url, links)
+        METRICS.count("outcome", "success")
+        METRICS.count("fetched_by", "http")
+        return None
+    except Exception as e:
+        METRICS.count("outcome", outcome_of(e))
+        return type(e).__name__
+
+async def scrape_in_fresh_page(url, state, limiter, sessions):
+    """Browser fallback for the HTTP path, on a short-lived page."""
+    async with state.browser_slots:
+        try:
+            session = await sessions.open_page()
+        except Exception as e:
+            # No browser to fall back on: the URL goes back to the retry queue
+            print(f"\n[browser] Fallback page for {url} failed to open: {type(e).__name__}")
+            METRICS.count("outcome", outcome_of(e))
+            return type(e).__name__
+        try:
+            METRICS.count("fetched_by", "browser")
+            return await scrape_url(session[1], url, state, limiter)
+        finally:
+            await sessions.close_page(session)
+
+async def scrape_url(page, url, state, limiter):
+    """Fetch and scrape one URL, once. Returns None on success, else the error class name."""
+    try:
+        # Every navigation spends a token from the shared budget
+        with METRICS.timer("rate_wait"):
+            await limiter.acquire()
+        # Navigate with randomized parameters
+        referer = random.choice(REFERERS)
+        started = time.monotonic()
+        try:
+            with METRICS.timer("goto"):
+                response = await page.goto(
+                    url,
+                    wait_until="domcontentloaded",
+                    timeout=20000,
+                    referer=referer
+                )
+        except Exception as e:
+            state.pacer.observe(error=type(e).__name__)
+            raise
+        # Feed the pacing controller with latency, status and Retry-After
+        if response is not None:
+            METRICS.count("http_status", str(response.status))
+            state.pacer.observe(
+                latency=time.monotonic() - started,
+                status=response.status,
+                retry_after=response.headers.get("retry-after"),
+            )
+        # 404, Cloudflare and overview checks plus extraction in one look
+        want_links = state.frontier is not None
+        info = await inspect_page(page, url, state.extract_mode, want_links)
+        # Check for 404 error
+        if info["not_found"]:
+            print(f"[404] Skipping and marking as scraped: {url}")
+            METRICS.count("outcome", "not_found")
+            with METRICS.timer("write"):
+                await state.mark_scraped(url)
+            return None
+
+        if info["challenge"]:
+            state.cloudflare_count += 1
+            METRICS.count("challenge_page", "seen")
+            state.pacer.observe(error="challenge")
+            with METRICS.timer("challenge"):
+                if await handle_cloudflare(page, url):
+                    info = await inspect_page(page, url, state.extract_mode, want_links)
+                    if info["challenge"]:
+                        raise ChallengeNotCleared("Cloudflare bypass failed")
+        # Wait for content to load
+        try:
+            with METRICS.timer("wait_selector"):
+                await page.wait_for_selector("h2.pp-overview__title", timeout=3000)
+        except PlaywrightTimeoutError:
+            # Fallback content check
+            if not info["has_overview"]:
+                raise
+        # Scrape data, looking again only if the title had not rendered yet
+        if not info["has_title"]:
+            info = await inspect_page(page, url, state.extract_mode, want_links)
+        if info.get("html") is not None:
+            # HTML path: parsing runs in the process pool, off the event loop
+            with METRICS.timer("parse"):
+                result, links = await state.parse_stage.parse(info["html"], url) if info["has_title"] else (None, None)
+        else:
+            result, links = info["record"], info.get("links")
+        if state.archive:
+            with METRICS.timer("archive"):
+                await state.archive_page(url, info.get("html") or await page.content())
+        if not result:
+            raise ParseMiss("Scraping failed")
+        with METRICS.timer("write"):
+            await state.save_result(url, result, validators_of(response.headers) if response else None)
+        await state.discover(url, links)
+        METRICS.count("outcome", "success")
+        return None
+    except Exception as e:
+        METRICS.count("outcome", outcome_of(e))
+        return type(e).__name__
+    finally:
+        # Clear cookies and storage between requests
         try:
-            with open(SCRAPED_LINKS_FILE, "r", encoding="utf-8") as f:
-                scraped_urls = set(json.load(f))
+            with METRICS.timer("cleanup"):
+                await page.context.clear_cookies()
+                await page.evaluate("() => sessionStorage.clear()")
+                await page.evaluate("() => localStorage.clear()")
         except Exception:
-            scraped_urls = set()
-    urls = [url for url in urls if url not in scraped_urls]
-    total_urls = len(urls)
-    print(f"Total URLs to scrape: {total_urls}")
-    
-    # Initialize counters
-    total_successful = 0
-    cloudflare_count = 0
+            pass
+
+async def fixed_pause(idx, limiter):
+    """The original hardcoded pacing, used with --pacing fixed."""
+    # Longer pauses hold back the whole pool, not just this worker
+    if idx % 40 == 0:
+        nap = random.randint(5, 10)
+        print(f"Long pause: Sleeping for {nap} seconds...")
+        limiter.pause(nap)
+    if idx % 1500 == 0:
+        nap = random.randint(50, 60)
+        print(f"Long pause: Sleeping for {nap} seconds...")
+        limiter.pause(nap)
+
+    # Randomized delay between requests
+    delay = random.uniform(3.0, 4.0)
+    with METRICS.timer("sleep"):
+        await asyncio.sleep(delay)
+
+async def worker(worker_id, queue, state, limiter, sessions, governor, pbar):
+    """Drain URLs from the shared queue on a browser context of our own."""
     consecutive_fails = 0
-    max_consecutive_fails = 2
-    start_time = time.time()
-    
-    # Create initial browser session
-    playwright, browser, context = await create_browser_session(headless)
-    page = await context.new_page()
-    
+    max_consecutive_fails = 3
+    context_pages = 0
+    # Opened before the first URL it is needed for; on the HTTP path only for fallbacks
+    session = None
+    generation = sessions.generation
+    LANE.set(f"worker {worker_id}")
     try:
-        with tqdm(total=total_urls, desc="Scraping", ncols=100) as pbar:
-            for idx, url in enumerate(urls):
+        while True:
+            url = await next_url(queue, state)
+            if url is None:
+                break
+
+            state.active += 1
+            state.dispatched += 1
+            idx = state.dispatched
+            CURRENT_URL.set(url)
+            url_started = time.perf_counter()
+
+            if state.http:
+                error = await fetch_http(url, state, limiter)
+                if error == BROWSER_FALLBACK:
+                    error = await scrape_in_fresh_page(url, state, limiter, sessions)
+            else:
                 if consecutive_fails >= max_consecutive_fails:
-                    print("Too many consecutive failures. Restarting browser...")
-                    await page.close()
-                    await context.close()
-                    await browser.close()
-                    playwright, browser, context = await create_browser_session(headless)
-                    page = await context.new_page()
+                    print(f"[w{worker_id}] Too many consecutive failures. Recycling context...")
+                    if session:
+                        await sessions.close_page(session)
+                        session = None
+                    await sessions.health_check()
                     consecutive_fails = 0
-                
-                attempt = 0
-                success = False
-                while attempt < 3 and not success:
-                    attempt += 1
+                elif session and generation != sessions.generation:
+                    # Another worker relaunched the browser; our context died with it
+                    await sessions.close_page(session)
+                    session = None
+
+                error = None
+                if session is None:
                     try:
-                        # Navigate with randomized parameters
-                        referer = random.choice(REFERERS)
-                        await page.goto(
-                            url,
-                            wait_until="domcontentloaded",
-                            timeout=20000,
-                            referer=referer
-                        )
-                        # Cloudflare detection and bypass
-                        content = await page.content()
-                        # Check for 404 error
-                        if "404 - Profile not found | PitchBook" in content:
-                            print(f"[404] Skipping and marking as scraped: {url}")
-                            # Add to scraped_urls if not present
-                            scraped_urls.add(url)
-                            # Save updated scraped links
-                            with open(SCRAPED_LINKS_FILE, 'w', encoding='utf-8') as f:
-                                json.dump(list(scraped_urls), f)
-                            success = True
-                            break
-
-                        # --- End save HTML ---
-                        if any(phrase in content for phrase in CLOUDFLARE_PHRASES):
-                            if await handle_cloudflare(page, url):
-                                content = await page.content()
-                                if any(phrase in content for phrase in CLOUDFLARE_PHRASES):
-                                    raise Exception("Cloudflare bypass failed")
-                        # Wait for content to load
-                        try:
-                            await page.wait_for_selector("h2.pp-overview__title", timeout=3000)
-                        except PlaywrightTimeoutError:
-                            # Fallback content check
-                            if "Company Overview" not in content:
-                                raise
-                        # Scrape data
-                        result = await scrape_company_from_page(page, url)
-                        if result:
-                            # Save result
-                            with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
-                                f.write(json.dumps(result, ensure_ascii=False) + '\n')
-                            # Update scraped links
-                            scraped_urls.add(url)
-                            with open(SCRAPED_LINKS_FILE, 'w', encoding='utf-8') as f:
-                                json.dump(list(scraped_urls), f)
-                            total_successful += 1
-                            consecutive_fails = 0
-                            success = True
-                        else:
-                            raise Exception("Scraping failed")
+                        session = await sessions.open_page()
+                        generation, context_pages = sessions.generation, 0
                     except Exception as e:
-                        if attempt >= 3:
-                            consecutive_fails += 1
-                        # Random delay before retry
-                        await asyncio.sleep(random.uniform(1.5, 3.0))
-                        continue
-                    finally:
-                        # Clear cookies and storage between requests
-                        await page.context.clear_cookies()
-                        await page.evaluate("() => sessionStorage.clear()")
-                        await page.evaluate("() => localStorage.clear()")
-                
-                # Update progress
+                        # No page to scrape on: the URL goes back to the retry queue
+                        print(f"\n[w{worker_id}] Could not open a browser page: {type(e).__name__}")
+                        METRICS.count("outcome", outcome_of(e))
+                        error = type(e).__name__
+                if session:
+                    error = await scrape_url(session[1], url, state, limiter)
+                    context_pages += 1
+            if error is None:
+                state.retries.done(url)
+                state.finish(url, 'done')
+                consecutive_fails = 0
+                state.done += 1
                 pbar.update(1)
-                elapsed = time.time() - start_time
-                process = psutil.Process(os.getpid())
-                mem_mb = process.memory_info().rss / (1024 * 1024)
-                pbar.set_postfix(
-                    s=total_successful,
-                    f=consecutive_fails,
-                    t=f"{elapsed:.1f}s",
-                    cf=cloudflare_count,
-                    m=f"{mem_mb:.1f}MB"
-                )
-                
-                # Rotate browser every 20 URLs
-                if idx > 0 and idx % 20 == 0:
-                    await page.close()
-                    await context.close()
-                    await browser.close()
-                    playwright, browser, context = await create_browser_session(headless)
-                    page = await context.new_page()
-                    print("\nBrowser rotated for fingerprint refresh")
-                
-                # Randomized delay between requests
-                delay = random.uniform(3.0, 4.0)
-                await asyncio.sleep(delay)
-                
-                # Longer pause every 40 URLs
-                if idx > 0 and idx % 40 == 0:
-                    nap = random.randint(5, 10)
-                    print(f"Long pause: Sleeping for {nap} seconds...")
-                    await asyncio.sleep(nap)
-                
-                # Longer pause every 1000 URLs
-                if idx > 0 and idx % 1500 == 0:
-                    nap = random.randint(50, 60)
-                    print(f"Long pause: Sleeping for {nap} seconds...")
-                    await asyncio.sleep(nap)
-    except KeyboardInterrupt:
+            else:
+                consecutive_fails += 1
+                # Back off this URL and move on; it comes back once it is due
+                if not state.retries.schedule(url, error):
+                    print(f"\n[dead-letter] {url} after {state.retries.budget} attempts ({error})")
+                    state.finish(url, 'dead')
+                    METRICS.count("outcome", "dead_letter")
+                    state.done += 1
+                    pbar.update(1)
+            state.retries.save()
+            state.active -= 1
+
+            # Update progress
+            elapsed = time.time() - state.start_time
+            mem_mb = governor.tree_mb()
+            if state.total_known and pbar.total != state.total_urls:
+                pbar.total = state.total_urls
+                pbar.refresh()
+            METRICS.gauge("done", state.done)
+            METRICS.gauge("total", state.total_urls)
+            METRICS.gauge("successful", state.total_successful)
+            METRICS.gauge("retries_pending", len(state.retries))
+            METRICS.gauge("rate_rps", round(state.pacer.rate, 4))
+            METRICS.gauge("tree_rss_mb", round(mem_mb, 1))
+            METRICS.gauge("blocked_requests", sessions.blocker.blocked)
+            pbar.set_postfix(
+                s=state.total_successful,
+                f=consecutive_fails,
+                rq=len(state.retries),
+                t=f"{elapsed:.1f}s",
+                cf=state.cloudflare_count,
+                r=f"{state.pacer.rate:.2f}",
+                b=sessions.blocker.blocked,
+                m=f"{mem_mb:.1f}MB"
+            )
+
+            # Relaunch the browser when the process tree outgrows the hard limit,
+            # otherwise rotate this worker's context on page count or soft limit
+            browser_reason = governor.browser_due() if session else None
+            context_reason = governor.context_due(context_pages) if session else None
+            if browser_reason or context_reason:
+                # The next URL opens the fresh page, and retries its URL if that fails
+                await sessions.close_page(session)
+                session = None
+                if browser_reason:
+                    await sessions.restart_browser(browser_reason, generation)
+                governor.invalidate()
+                print(f"\n[w{worker_id}] Context rotated: {browser_reason or context_reason}")
+
+            if state.pacer.adaptive:
+                # The controller sets the pace; jitter keeps workers out of lockstep
+                with METRICS.timer("sleep"):
+                    await asyncio.sleep(random.uniform(0.0, 0.5))
+            else:
+                await fixed_pause(idx, limiter)
+            if METRICS.tracer:
+                METRICS.tracer.complete("url", url_started, time.perf_counter() - url_started,
+                                        outcome=error or "ok")
+            CURRENT_URL.set(None)
+    finally:
+        if session:
+            await sessions.close_page(session)
+
+async def feed_urls(queue, urls, state, count_fed=False, batch_size=1000):
+    # Reading and filtering happen in a thread, so skipping a long run of
+    # already scraped URLs never stalls the workers
+    read_batch = chunk_reader(urls, batch_size)
+    while True:
+        batch = await asyncio.to_thread(read_batch)
+        if not batch:
+            break
+        if state.frontier:
+            batch = await asyncio.to_thread(state.frontier.claim, batch)
+        for url in batch:
+            await queue.put(url)
+            state.fed += 1
+    if count_fed:
+        # stdin can only be read once, so its total is what we fed
+        state.set_total(state.total_urls + state.fed)
+
+async def feed_discovered(queue, list_feed, state, batch_size=100):
+    """Feed the URL list and the discovery frontier side by side until both run dry."""
+    listed = asyncio.create_task(list_feed)
+    quiet = 0
+    try:
+        while True:
+            if len(state.finished) >= batch_size:
+                await sync_frontier(state)
+            urls = await asyncio.to_thread(state.frontier.pop, batch_size, state.wanted)
+            for url in urls:
+                await queue.put(url)
+            if urls:
+                quiet = 0
+                continue
+            # Nothing to hand out: finished once the list is fed and no page
+            # that could still add links is queued, in flight or due a retry
+            # (seen on two checks in a row, as a URL can be between the two)
+            if listed.done() and queue.empty() and not state.active and not len(state.retries):
+                quiet += 1
+                if quiet >= 2:
+                    break
+            else:
+                quiet = 0
+            await sync_frontier(state)
+            await asyncio.sleep(1)
+        await listed
+    finally:
+        listed.cancel()
+
+async def run_feed(feed, state):
+    try:
+        await feed
+    finally:
+        # From here workers stop once the queue and the retry queue are empty
+        state.feed_done = True
+
+async def count_total(state, count_remaining):
+    """Fill in the progress total from a second pass over the URL list."""
+    # The count runs far ahead of the rate-limited fetchers, so it sees each
+    # URL before a worker can finish it and drop it from `wanted`
+    count = await asyncio.to_thread(count_remaining)
+    state.set_total(state.total_urls + count)
+
+async def feed_leases(queue, state, lease_size):
+    """Feed the queue from leases on the shared work store until it runs dry."""
+    store = state.store
+    while True:
+        urls = await asyncio.to_thread(store.lease, lease_size)
+        if urls:
+            for url in urls:
+                await queue.put(url)
+            continue
+        # Nothing free: stop once every URL is finished, else wait for
+        # in-flight work (ours or another worker's) or expired leases
+        await sync_work_store(state)
+        if await asyncio.to_thread(store.remaining) == 0:
+            break
+        await asyncio.sleep(5)
+
+async def sync_frontier(state):
+    """Commit local results, then mark finished URLs done in the frontier."""
+    await state.sink.flush()
+    urls, state.finished = [url for url, status in state.finished], []
+    await asyncio.to_thread(state.frontier.done, urls)
+
+async def sync_work_store(state):
+    """Commit local results, then report finished URLs and renew our leases."""
+    await state.sink.flush()
+    outcomes, state.finished = state.finished, []
+    await asyncio.to_thread(state.store.complete, outcomes)
+    await asyncio.to_thread(state.store.heartbeat)
+
+async def keep_leases(state, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await sync_work_store(state)
+
+async def next_url(queue, state):
+    """Due retries first, then fresh URLs; None once both are exhausted or we are draining."""
+    while True:
+        if state.draining:
+            return None
+        url = state.retries.pop_due()
+        if url is not None:
+            return url
+        if not queue.empty():
+            return queue.get_nowait()
+        wait = state.retries.next_due_in()
+        if state.feed_done and wait is None:
+            return None
+        # Wake for whichever comes first: a fresh URL or the next due retry
+        try:
+            return await asyncio.wait_for(queue.get(), min(wait if wait is not None else 1.0, 1.0))
+        except asyncio.TimeoutError:
+            continue
+
+def report_status(path, state, phase, complete=False):
+    write_status(path, state=phase, complete=complete,
+                 done=state.done, total=state.total_urls if state.total_known else None,
+                 successful=state.total_successful,
+                 retries_pending=len(state.retries), dead_lettered=state.retries.dead_lettered,
+                 scraped_total=len(state.sink.journal), rate_rps=round(state.pacer.rate, 4))
+
+async def keep_status(path, state, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(report_status, path, state, "draining" if state.draining else "running")
+
+def comma_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Advanced Stealth Playwright Scraper")
+    parser.add_argument('--headfull', action='store_true', help='Run browser in headful (visible) mode')
+    parser.add_argument('--urls', default=URL_LIST_FILE,
+                        help='URL list: JSON array, JSONL or plain text, optionally gzipped; - reads '
+                             f'stdin (default: {URL_LIST_FILE})')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Number of page workers draining the URL queue (default: 1)')
+    parser.add_argument('--max-rate', type=float, default=0.3,
+                        help='Total requests per second sent to PitchBook across all workers; '
+                             'the ceiling in adaptive pacing (default: 0.3)')
+    parser.add_argument('--pacing', choices=['adaptive', 'fixed'], default='adaptive',
+                        help='adaptive: AIMD on latency, errors and 429/503; fixed: the old '
+                             'per-URL sleeps and long pauses (default: adaptive)')
+    parser.add_argument('--min-rate', type=float, default=0.05,
+                        help='Floor for adaptive pacing in requests per second (default: 0.05)')
+    parser.add_argument('--target-latency', type=float, default=8.0,
+                        help='Navigation seconds above which adaptive pacing backs off (default: 8)')
+    parser.add_argument('--burst', type=int, default=1,
+                        help='Requests allowed back to back after an idle spell (default: 1)')
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='Results buffered before a batch is written (default: 50)')
+    parser.add_argument('--flush-interval', type=float, default=5.0,
+                        help='Seconds before a partial batch is written anyway (default: 5)')
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='batch',
+                        help='When to fsync results and checkpoint: none, batch or record (default: batch)')
+    parser.add_argument('--fetch-mode', choices=['browser', 'http'], default='browser',
+                        help='browser: every profile is a Chromium navigation; http: fetch with a pooled '
+                             'HTTP client and use the browser only when the response lacks the profile '
+                             'markers (default: browser)')
+    parser.add_argument('--browser-slots', type=int, default=2,
+                        help='Browser pages open at once for HTTP fallbacks (default: 2)')
+    parser.add_argument('--extract-mode', choices=['browser', 'html'], default='browser',
+                        help='Run field extraction inside the page (browser) or serialize '
+                             'the DOM and parse it in Python (html) (default: browser)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes parsing page HTML on the html path (default: number of cores)')
+    parser.add_argument('--parse-queue', type=int, default=None,
+                        help='Pages allowed to wait for a parser before fetchers block (default: 2x parse workers)')
+    parser.add_argument('--context-pages', type=int, default=20,
+                        help='Pages a worker loads before its context is recycled (default: 20)')
+    parser.add_argument('--max-memory-mb', type=int, default=0,
+                        help='Recycle contexts once RSS of the whole process tree exceeds this (default: off)')
+    parser.add_argument('--hard-memory-mb', type=int, default=0,
+                        help='Relaunch the browser above this tree RSS (default: 1.5x --max-memory-mb)')
+    parser.add_argument('--block-mode', choices=BLOCK_MODES, default='route',
+                        help='Where subrequests are blocked: route (narrow route patterns), cdp (inside '
+                             'Chromium, but every request\'s network events reach Python) or python '
+                             '(check every request here) (default: route)')
+    parser.add_argument('--block-types', type=comma_list, default=None,
+                        help=f'Resource types to block (default: {",".join(DEFAULT_BLOCK_TYPES)})')
+    parser.add_argument('--block-urls', type=comma_list, default=None,
+                        help='URL wildcard patterns to block (default: common analytics hosts)')
+    parser.add_argument('--retry-budget', type=int, default=5,
+                        help=f'Attempts per URL before it goes to {DEAD_LETTER_FILE} (default: 5)')
+    parser.add_argument('--retry-base-delay', type=float, default=30.0,
+                        help='Backoff before the first retry in seconds, doubling per attempt (default: 30)')
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help='Static sharding: only handle URLs whose hash falls in shard i of n (e.g. 0/4)')
+    parser.add_argument('--work-store', default=None,
+                        help='SQLite work store shared by all workers; URLs are leased from it in batches')
+    parser.add_argument('--worker-id', default=None,
+                        help='Name of this worker in the work store and in its output files '
+                             '(default: hostname-pid)')
+    parser.add_argument('--lease-size', type=int, default=20,
+                        help='URLs leased per batch from the work store (default: 20)')
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help='Lease lifetime; renewed every third of it while the worker lives (default: 300)')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='Serve Prometheus metrics on 127.0.0.1:PORT (default: off)')
+    parser.add_argument('--stats-file', default=STATS_FILE,
+                        help=f'JSON snapshot of stage timings and counters (default: {STATS_FILE})')
+    parser.add_argument('--stats-interval', type=float, default=15.0,
+                        help='Seconds between stats file updates (default: 15)')
+    parser.add_argument('--status-file', default=STATUS_FILE,
+                        help=f'Small progress file read by `status` and `supervise` (default: {STATUS_FILE})')
+    parser.add_argument('--status-interval', type=float, default=5.0,
+                        help='Seconds between status file updates (default: 5)')
+    parser.add_argument('--recrawl-age', type=float, default=None, metavar='DAYS',
+                        help='Recrawl mode: re-fetch saved profiles last fetched more than DAYS ago '
+                             'instead of reading --urls; unchanged records are not rewritten')
+    parser.add_argument('--recrawl-order', choices=RECRAWL_ORDERS, default='age',
+                        help='Recrawl the stalest profiles first (age) or those that changed most often (changes)')
+    parser.add_argument('--freshness-db', default=FRESHNESS_FILE,
+                        help=f'Per-URL fetch history for recrawls (default: {FRESHNESS_FILE})')
+    parser.add_argument('--discover', action='store_true',
+                        help='Also crawl profiles linked from scraped pages, from a persistent frontier')
+    parser.add_argument('--discover-depth', type=int, default=2,
+                        help='Follow links at most this many hops from the URL list (default: 2)')
+    parser.add_argument('--frontier-db', default=FRONTIER_FILE,
+                        help=f'Discovered URLs and the seen-set (default: {FRONTIER_FILE})')
+    parser.add_argument('--export-dir', default=None,
+                        help='Also write new records to a columnar file in this directory, one part per run')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, default='parquet',
+                        help='Columnar format for --export-dir (default: parquet)')
+    parser.add_argument('--export-row-group-size', type=int, default=ROW_GROUP_SIZE,
+                        help=f'Records per row group in columnar exports (default: {ROW_GROUP_SIZE})')
+    parser.add_argument('--profile', action='store_true',
+                        help='Trace every URL, sample the event loop and flag loop stalls (see --profile-dir)')
+    parser.add_argument('--profile-dir', default=PROFILE_DIR,
+                        help=f'Where --profile writes trace.json and loop_stacks.folded (default: {PROFILE_DIR})')
+    parser.add_argument('--profile-interval', type=float, default=5.0,
+                        help='Milliseconds between event-loop stack samples (default: 5)')
+    parser.add_argument('--lag-threshold', type=float, default=100.0,
+                        help='Flag loop lag and callbacks holding the loop longer than this many ms (default: 100)')
+    parser.add_argument('--archive', action='store_true',
+                        help=f'Keep a compressed copy of every fetched page under {ARCHIVE_DIR}/')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help=f'Archive location (default: {ARCHIVE_DIR})')
+    parser.add_argument('--archive-codec', choices=CODECS, default=DEFAULT_CODEC,
+                        help=f'Compression for archived pages (default: {DEFAULT_CODEC})')
+
+    subparsers = parser.add_subparsers(dest='command')
+    reparse = subparsers.add_parser('reparse', help='Re-extract records from the HTML archive, no browser')
+    reparse.add_argument('--archive-dir', default=ARCHIVE_DIR, help=f'Archive location (default: {ARCHIVE_DIR})')
+    reparse.add_argument('--output', default='results.reparsed.json',
+                         help='Where to write the re-extracted records (default: results.reparsed.json)')
+    reparse.add_argument('--workers', type=int, default=None,
+                         help='Parser processes (default: number of cores)')
+    supervise = subparsers.add_parser('supervise', help='Run the scraper as a child, restarting it until every URL is done')
+    supervise.add_argument('--min-backoff', type=float, default=5.0,
+                           help='Seconds before the first restart; doubles per quick crash (default: 5)')
+    supervise.add_argument('--max-backoff', type=float, default=300.0,
+                           help='Longest wait between restarts (default: 300)')
+    supervise.add_argument('--drain-timeout', type=float, default=120.0,
+                           help='Seconds a stopping scraper gets to finish in-flight URLs before it is killed (default: 120)')
+    supervise.add_argument('scraper_args', nargs=argparse.REMAINDER,
+                           help='Options for the scraper itself, after --')
+    status = subparsers.add_parser('status', help='Print progress from the status file')
+    status.add_argument('--status-file', default=STATUS_FILE, help=f'Status file to read (default: {STATUS_FILE})')
+    compact = subparsers.add_parser('compact', help='Write the latest record per URL, sorted and indexed')
+    compact.add_argument('inputs', nargs='*', default=[RESULTS_FILE],
+                         help=f'Results files to merge; later ones win (default: {RESULTS_FILE})')
+    compact.add_argument('--output', default=COMPACT_FILE,
+                         help=f'Compacted segment; its index goes next to it as .idx (default: {COMPACT_FILE})')
+    compact.add_argument('--run-size', type=int, default=200000,
+                         help='Records sorted in memory at a time (default: 200000)')
+    export = subparsers.add_parser('export', help='Convert results files to Parquet or Arrow IPC')
+    export.add_argument('inputs', nargs='*', default=[RESULTS_FILE],
+                        help=f'Results files to convert, e.g. the output of compact (default: {RESULTS_FILE})')
+    export.add_argument('--output', default=None, help='Output file (default: results.parquet or results.arrow)')
+    export.add_argument('--format', choices=EXPORT_FORMATS, default='parquet', help='Columnar format (default: parquet)')
+    export.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE,
+                        help=f'Records per row group (default: {ROW_GROUP_SIZE})')
+    lookup = subparsers.add_parser('lookup', help='Print the record of a company from the compacted segment')
+    lookup.add_argument('companies', nargs='+', help='Profile URLs or company IDs such as 12345-67')
+    lookup.add_argument('--segment', default=COMPACT_FILE, help=f'Compacted segment to read (default: {COMPACT_FILE})')
+    return parser
+
+async def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.command == 'reparse':
+        reparse_archive(args.archive_dir, args.output, args.workers)
+        return
+    if args.command == 'status':
+        sys.exit(show_status(args.status_file))
+    if args.command == 'supervise':
+        supervise(args)
+        return
+    if args.command == 'compact':
+        compact_results(args.inputs, args.output, args.run_size)
+        return
+    if args.command == 'export':
+        output = args.output or os.path.splitext(RESULTS_FILE)[0] + EXTENSIONS[args.format]
+        export_results(args.inputs, output, args.format, args.row_group_size)
+        return
+    if args.command == 'lookup':
+        sys.exit(lookup(args.segment, args.companies))
+    if args.shard and args.work_store:
+        # The store already hands each URL to exactly one worker
+        parser.error("--shard and --work-store are alternative ways to split a crawl; use one")
+    await crawl(args)
+
+def tagged(path, tag):
+    """'results.json' -> 'results.<tag>.json', so parallel workers never share a file."""
+    if not tag:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext}"
+
+def run_tag(args):
+    """File tag for sharded and leased workers (None for a plain single run)."""
+    if args.work_store:
+        return args.worker_id or default_worker_id()
+    if args.shard:
+        return f"shard{args.shard[0]}of{args.shard[1]}"
+    return None
+
+def lookup(segment, companies):
+    """Print each company's record as one JSON line; returns 1 if any is missing."""
+    missing = 0
+    with ResultsIndex(segment) as index:
+        for company in companies:
+            record = index.get(company)
+            if record is None:
+                print(f"Not found: {company}", file=sys.stderr)
+                missing += 1
+            else:
+                print(json.dumps(record, ensure_ascii=False))
+    return 1 if missing else 0
+
+def supervise(args):
+    scraper_args = args.scraper_args
+    if scraper_args[:1] == ['--']:
+        scraper_args = scraper_args[1:]
+    child = build_parser().parse_args(scraper_args)
+    if child.command:
+        raise SystemExit("supervise runs the crawl; pass only crawl options after --")
+    if child.work_store and not child.worker_id:
+        # One identity across restarts, so every child reuses the same result files
+        child.worker_id = default_worker_id()
+        scraper_args += ['--worker-id', child.worker_id]
+    status_file = tagged(child.status_file, run_tag(child))
+    command = [sys.executable, os.path.abspath(__file__)] + scraper_args
+    Supervisor(command, status_file, args.min_backoff, args.max_backoff,
+               drain_timeout=args.drain_timeout).run()
+
+async def crawl(args):
+    headless = not args.headfull
+    concurrency = max(1, args.concurrency)
+    shard = args.shard
+    # Sharded and leased workers each keep their own results and checkpoint
+    tag = run_tag(args)
+    store = SqliteWorkStore(args.work_store, tag, args.lease_seconds) if args.work_store else None
+    results_file = tagged(RESULTS_FILE, tag)
+    stats_file = tagged(args.stats_file, tag)
+    status_file = tagged(args.status_file, tag)
+    
+    # Filter out already scraped URLs (migrates the old JSON checkpoint once)
+    scraped_urls = CheckpointJournal(tagged(SCRAPED_LINKS_FILE, tag),
+                                     None if tag else LEGACY_SCRAPED_LINKS_FILE).load()
+    # A crawl moved to shards or a work store also skips what the single
+    # process run finished; that journal is only read, never written
+    earlier = CheckpointJournal(SCRAPED_LINKS_FILE).load(readonly=True) \
+        if tag and os.path.exists(SCRAPED_LINKS_FILE) else None
+
+    def scraped(url):
+        return url in scraped_urls or (earlier is not None and url in earlier)
+    recrawl = args.recrawl_age is not None
+    if recrawl and store:
+        raise SystemExit("--recrawl-age works on this worker's own results; it cannot be combined with --work-store")
+    # Recrawls need per-URL fetch history; it is kept in its own SQLite file
+    freshness = FreshnessStore(tagged(args.freshness_db, tag)) if recrawl else None
+    if args.discover and (store or recrawl):
+        raise SystemExit("--discover grows a crawl of the URL list; it cannot be combined with --work-store or --recrawl-age")
+    frontier = Frontier(tagged(args.frontier_db, tag), args.discover_depth) if args.discover else None
+    exporter = None
+    if args.export_dir:
+        # One part per run: a Parquet/Arrow file cannot be appended to once closed
+        os.makedirs(args.export_dir, exist_ok=True)
+        part = f"part-{datetime.now():%Y%m%d-%H%M%S}-{tag or os.getpid()}{EXTENSIONS[args.export_format]}"
+        exporter = ColumnarWriter(os.path.join(args.export_dir, part), args.export_format, args.export_row_group_size)
+    sink = ResultsSink(results_file, scraped_urls, args.batch_size, args.flush_interval, args.fsync,
+                       on_commit=freshness.commit if freshness else None, exporter=exporter)
+    sink.recover()
+    # Pending retries are served from the retry queue; dead letters wait for a manual rerun
+    retries = RetryQueue(tagged(RETRY_QUEUE_FILE, tag), tagged(DEAD_LETTER_FILE, tag),
+                         budget=args.retry_budget, base_delay=args.retry_base_delay).load()
+    # The URL list is streamed and filtered lazily, never held in memory
+    if store:
+        # The shared store decides who fetches what; the first worker seeds it
+        seeded = await asyncio.to_thread(store.seed, (url for url in iter_urls(args.urls) if not scraped(url)))
+        if seeded:
+            print(f"Seeded work store {args.work_store} with {seeded} URLs")
+        urls, wanted = None, None
+        total_urls = store.remaining()
+        print(f"Worker {store.worker_id} leasing from {args.work_store}")
+    elif recrawl:
+        # Profiles already in results.json but new to the store are due at once
+        seeded = freshness.seed_from_results(results_file)
+        if seeded:
+            print(f"Added {seeded} saved profiles to {freshness.path}")
+        max_age = args.recrawl_age * 86400
+        def wanted(url):
+            return url not in retries and (not shard or in_shard(url, shard))
+        urls = (url for url in freshness.due(max_age, args.recrawl_order) if wanted(url))
+        total_urls = len(retries)
+    else:
+        def wanted(url):
+            return not scraped(url) and url not in retries and (not shard or in_shard(url, shard))
+        urls = (url for url in iter_urls(args.urls) if wanted(url))
+        # Counted in the background once the crawl is under way
+        total_urls = len(retries) + (frontier.pending() if frontier else 0)
+    print(f"Total URLs to scrape: {total_urls if store else 'counting'} ({concurrency} workers, {args.max_rate} req/s)")
+    
+    archive = HtmlArchive(args.archive_dir, args.archive_codec) if args.archive else None
+    parse_stage = ParseStage(args.parse_workers, args.parse_queue, links=frontier is not None)
+    adaptive = args.pacing == 'adaptive'
+    limiter = TokenBucket(args.max_rate / 2 if adaptive else args.max_rate, args.burst)
+    pacer = RateController(limiter, args.min_rate, args.max_rate, adaptive, target_latency=args.target_latency)
+    http = HttpFetcher(USER_AGENTS, ACCEPT_LANGUAGE, max_connections=concurrency) if args.fetch_mode == 'http' else None
+    state = CrawlState(sink, parse_stage, pacer, retries, total_urls, args.extract_mode, archive, store,
+                       http, args.browser_slots, freshness, recrawl, frontier, wanted)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    
+    blocker = ResourceBlocker(args.block_mode, args.block_types, args.block_urls)
+    sessions = SessionManager(headless, blocker)
+    governor = MemoryGovernor(args.max_memory_mb, args.hard_memory_mb, args.context_pages)
+    profiler = Profiler(tagged(args.profile_dir, tag), args.profile_interval / 1000,
+                        args.lag_threshold / 1000) if args.profile else None
+    if profiler:
+        profiler.start()
+    await sink.start()
+    await parse_stage.start()
+    metrics_server = await serve_metrics(args.metrics_port) if args.metrics_port else None
+    report_status(status_file, state, "running")
+    loop = asyncio.get_running_loop()
+    complete = False
+    try:
+        if not http:
+            await sessions.start()
+        with tqdm(total=total_urls if store else None, desc="Scraping", ncols=100) as pbar:
+            background = [asyncio.create_task(flush_stats_periodically(stats_file, args.stats_interval)),
+                          asyncio.create_task(keep_status(status_file, state, args.status_interval))]
+            if store:
+                feed = feed_leases(queue, state, args.lease_size)
+                background.append(asyncio.create_task(keep_leases(state, args.lease_seconds / 3)))
+            elif args.urls == '-' and not recrawl:
+                feed = feed_urls(queue, urls, state, count_fed=True)
+            else:
+                feed = feed_urls(queue, urls, state)
+                if recrawl:
+                    count_remaining = lambda: sum(1 for url in freshness.due(max_age, args.recrawl_order) if wanted(url))
+                else:
+                    count_remaining = lambda: count_urls(args.urls, wanted)
+                background.append(asyncio.create_task(count_total(state, count_remaining)))
+            if frontier:
+                feed = feed_discovered(queue, feed, state)
+            feed_task = asyncio.create_task(run_feed(feed, state))
+            workers = [
+                asyncio.create_task(worker(i, queue, state, limiter, sessions, governor, pbar),
+                                    name=f"worker-{i}")
+                for i in range(concurrency)
+            ]
+
+            def drain():
+                # SIGTERM: stop handing out URLs, let workers finish the page
+                # they are on, then fall through to the flushes below
+                if not state.draining:
+                    print("\nSIGTERM received: finishing in-flight URLs, then flushing results")
+                state.draining = True
+                feed_task.cancel()
+                report_status(status_file, state, "draining")
+            loop.add_signal_handler(signal.SIGTERM, drain)
+            try:
+                await asyncio.gather(*workers)
+                if not state.draining:
+                    # Surfaces a feed error once the workers have run out of URLs
+                    await feed_task
+                    complete = True
+            finally:
+                loop.remove_signal_handler(signal.SIGTERM)
+                for task in [feed_task] + workers + background:
+                    task.cancel()
+                await asyncio.gather(feed_task, *workers, *background, return_exceptions=True)
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\nScraping interrupted by user")
     finally:
-        # Clean up
         try:
-            await page.close()
-            await context.close()
-            await browser.close()
-            await playwright.stop()
-        except:
+            await sessions.close()
+        except Exception:
             pass
-        
-        elapsed = time.time() - start_time
-        success_rate = (total_successful / total_urls) * 100 if total_urls else 0
-        print(f"\nScraping completed: {total_successful}/{total_urls} ({success_rate:.1f}%)")
+        if http:
+            await http.close()
+        # Commit whatever is still buffered before reporting
+        await parse_stage.close()
+        await sink.close()
+        if profiler:
+            await profiler.stop()
+        if freshness:
+            freshness.close()
+        if frontier:
+            # Results are committed above, so everything finished is durable
+            frontier.done(url for url, status in state.finished)
+            frontier.close()
+        if store:
+            # Only now, with results on disk, tell the other workers these are done
+            await sync_work_store(state)
+            store.close()
+        elapsed = time.time() - state.start_time
+        total_urls = state.total_urls
+        success_rate = (state.total_successful / total_urls) * 100 if total_urls else 0
+        print(f"\nScraping completed: {state.total_successful}/{total_urls} ({success_rate:.1f}%)")
         print(f"Total time: {elapsed:.2f} seconds")
+        retries.save(force=True)
+        print(f"Retries pending: {len(retries)}, dead-lettered this run: {retries.dead_lettered} ({retries.dead_letter_path})")
+        print(f"Session setup: {sessions.timing_summary()}")
+        print(f"Resource blocking: {blocker.summary(state.dispatched)}")
+        print(f"Stage timings:\n{METRICS.summary()}")
+        METRICS.write_json(stats_file)
+        report_status(status_file, state, "finished" if complete else "stopped", complete)
+        if metrics_server:
+            metrics_server.close()
+        scraped_urls.close()
+        if earlier is not None:
+            earlier.close()
 
 if __name__ == "__main__":
     try:
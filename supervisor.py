@@ -0,0 +1,153 @@
+import json
+import os
+import signal
+import subprocess
+import time
+
+STATUS_FILE = 'scraper_status.json'
+SUPERVISOR_PID_FILE = 'supervisor.pid'
+
+
+def write_status(path, **fields):
+    """Small status file the scraper rewrites as it goes; readers never scan the URL lists."""
+    fields["pid"] = os.getpid()
+    fields["updated"] = time.time()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(fields, f)
+    os.replace(tmp_path, path)
+
+def read_status(path=STATUS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def read_pid(path=SUPERVISOR_PID_FILE):
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def show_status(path=STATUS_FILE):
+    """One-line status in O(1): reads only the status file."""
+    status = read_status(path)
+    if not status:
+        print("✗ No status yet")
+        return 1
+    running = pid_alive(status.get("pid")) and status.get("state") in ("running", "draining")
+    done, total = status.get("done", 0), status.get("total")
+    if total is None:
+        total = "counting"
+    age = time.time() - status.get("updated", 0)
+    mark = "✓ Running" if running else "✗ Not running"
+    line = (f"{mark} (PID: {status.get('pid')}, {status.get('state')}) | "
+            f"This run: {done}/{total} | Scraped overall: {status.get('scraped_total', 0)} | "
+            f"Retries: {status.get('retries_pending', 0)} | Updated {age:.0f}s ago")
+    if status.get("complete"):
+        line += " | COMPLETE"
+    supervisor_pid = read_pid()
+    if pid_alive(supervisor_pid):
+        line += f" | Supervisor PID: {supervisor_pid}"
+    print(line)
+    return 0
+
+
+class Supervisor:
+    """Runs the scraper as a child process and keeps it going until the list is done.
+
+    - a child that exits before the status file says complete is restarted
+      with exponential backoff (reset once a child has run `healthy_after` s)
+    - SIGTERM/SIGINT are forwarded to the child as SIGTERM, which makes it
+      finish in-flight URLs and flush results; it is only killed if it has
+      not exited after `drain_timeout` seconds
+    - whatever is left of the child's process group once it exits (parse
+      workers, a browser orphaned by a crash) is killed before a restart
+    """
+
+    def __init__(self, command, status_file=STATUS_FILE, min_backoff=5.0, max_backoff=300.0,
+                 healthy_after=600.0, drain_timeout=120.0):
+        self.command = command
+        self.status_file = status_file
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.drain_timeout = drain_timeout
+        self.child = None
+        self.stopping = False
+
+    def log(self, message):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - [supervisor] {message}", flush=True)
+
+    def _on_signal(self, signum, frame):
+        self.stopping = True
+        if self.child and self.child.poll() is None:
+            self.log(f"Signal {signum}: draining scraper (PID {self.child.pid})")
+            self.child.send_signal(signal.SIGTERM)
+
+    def _wait_child(self):
+        deadline = None
+        while self.child.poll() is None:
+            if self.stopping:
+                deadline = deadline or time.monotonic() + self.drain_timeout
+                if time.monotonic() > deadline:
+                    self.log("Drain timed out; killing scraper and its browser")
+                    self._kill_group()
+            time.sleep(0.5)
+        # A crashed child leaves its parse workers and browser behind in its group
+        self._kill_group()
+        return self.child.returncode
+
+    def _kill_group(self):
+        try:
+            os.killpg(self.child.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        with open(SUPERVISOR_PID_FILE, 'w') as f:
+            f.write(str(os.getpid()))
+        backoff = self.min_backoff
+        try:
+            while not self.stopping:
+                started = time.monotonic()
+                # Own session: a terminal Ctrl-C reaches only us, and we drain the child
+                self.child = subprocess.Popen(self.command, start_new_session=True)
+                self.log(f"Started scraper (PID {self.child.pid})")
+                code = self._wait_child()
+                ran = time.monotonic() - started
+                self.log(f"Scraper exited with code {code} after {ran:.0f}s")
+                if self.stopping:
+                    break
+                if read_status(self.status_file).get("complete"):
+                    self.log("All URLs scraped; stopping")
+                    return 0
+                if ran > self.healthy_after:
+                    backoff = self.min_backoff
+                delay, backoff = backoff, min(self.max_backoff, backoff * 2)
+                self.log(f"Restarting in {delay:.0f}s")
+                slept = 0.0
+                while slept < delay and not self.stopping:
+                    time.sleep(0.5)
+                    slept += 0.5
+            return 0
+        finally:
+            try:
+                os.remove(SUPERVISOR_PID_FILE)
+            except OSError:
+                pass
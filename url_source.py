@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+import sys
+from itertools import islice
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_url_source(path):
+    """Text stream over a URL list file ('-' for stdin), gunzipped if needed."""
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        raw = io.BufferedReader(gzip.GzipFile(fileobj=raw))
+    head = raw.peek(64).lstrip(b'\xef\xbb\xbf \t\r\n')
+    kind = chr(head[0]) if head else ''
+    return io.TextIOWrapper(raw, encoding='utf-8-sig'), kind
+
+def _url_of(item):
+    if isinstance(item, dict):
+        item = item.get("url")
+    return item.strip() if isinstance(item, str) else None
+
+def _jsonl_item(line):
+    line = line.strip()
+    # Plain quoted URLs without escapes skip the JSON decoder
+    if line[:1] == '"' and line[-1:] == '"' and '\\' not in line:
+        return line[1:-1]
+    return json.loads(line) if line else None
+
+def _iter_json_array(f, chunk_size=1 << 16):
+    """Elements of a top-level JSON array, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = f.read(chunk_size).lstrip(), 1, False
+    if not buf.startswith('['):
+        raise ValueError("URL list is not a JSON array")
+    while True:
+        # Skip separators; refill when the buffer runs out
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos >= len(buf):
+                raise ValueError
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                if buf[pos:].strip():
+                    raise ValueError("URL list ends in the middle of an element")
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield item
+        pos = end
+
+def iter_urls(path):
+    """Stream URLs from a JSON array, JSONL (strings or {"url": ...}) or plain text file.
+
+    The format is sniffed from the first character, and gzip from the magic
+    bytes, so `url_list.json`, `urls.jsonl.gz` and `-` (stdin) all work. Only
+    one chunk of the file is in memory at a time.
+    """
+    f, kind = open_url_source(path)
+    with f:
+        if kind == '[':
+            items = _iter_json_array(f)
+        elif kind in ('{', '"'):
+            items = map(_jsonl_item, f)
+        else:
+            items = (line for line in f if not line.lstrip().startswith('#'))
+        for item in items:
+            url = _url_of(item)
+            if url:
+                yield url
+
+def count_urls(path, keep=None):
+    """Number of URLs in `path` passing `keep`; None for stdin, which can only be read once."""
+    if path == '-':
+        return None
+    return sum(1 for url in iter_urls(path) if keep is None or keep(url))
+
+def chunk_reader(iterable, size):
+    """Function returning the next list of up to `size` items ([] when exhausted)."""
+    iterator = iter(iterable)
+    return lambda: list(islice(iterator, size))
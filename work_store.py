@@ -0,0 +1,161 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def parse_shard(value):
+    """'i/n' -> (i, n) for --shard."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"shard must look like i/n, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {value!r}")
+    return index, count
+
+def in_shard(url, shard):
+    """Stable URL -> shard assignment, identical on every machine."""
+    index, count = shard
+    return zlib.crc32(url.encode('utf-8')) % count == index
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SqliteWorkStore:
+    """Shared work queue that many scraper processes lease URLs from.
+
+    Any store with the same methods (seed, lease, heartbeat, complete,
+    remaining) can stand in for this one; SQLite in WAL mode on a disk every
+    worker can reach is the local backend. A lease is good for
+    `lease_seconds` and is extended by `heartbeat()`, so the URLs of a worker
+    that dies are handed out again once its leases expire. URLs only move to
+    done/dead once the worker has committed them locally, so no URL is
+    fetched twice unless a worker dies mid-lease.
+    """
+
+    def __init__(self, path, worker_id=None, lease_seconds=300):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS work (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                updated REAL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS work_status ON work (status, lease_expires)")
+        # Seeding state: 'seeder' and its last 'progress' while loading, then 'seeded'
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _transaction(self, fn):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self.db.execute("COMMIT")
+                return result
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def seed(self, urls, batch=10000, poll=2.0):
+        """Load URLs once; returns how many this worker added.
+
+        The first worker to claim the seeder role loads the list in chunks,
+        each committed on its own, and writes a 'seeded' marker at the end.
+        Other workers poll for the marker rather than queue on the write
+        lock. A seeder that makes no progress for `lease_seconds` is taken
+        over; inserts are idempotent, so the new seeder simply starts over.
+        """
+        while True:
+            role = self._transaction(self._claim_seeding)
+            if role == 'seeded':
+                return 0
+            if role == 'seed':
+                break
+            time.sleep(poll)
+        now = time.time()
+        added = 0
+        chunk = []
+        for url in urls:
+            chunk.append((url, now))
+            if len(chunk) >= batch:
+                added += self._transaction(lambda: self._insert(chunk))
+                chunk = []
+        added += self._transaction(lambda: self._insert(chunk))
+        self._transaction(lambda: self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded', ?)", (str(time.time()),)))
+        return added
+
+    def _claim_seeding(self):
+        """'seeded', 'seed' if this worker should load the list, or 'wait'."""
+        meta = dict(self.db.execute("SELECT key, value FROM meta").fetchall())
+        if 'seeded' in meta:
+            return 'seeded'
+        now = time.time()
+        if 'seeder' not in meta and self.db.execute("SELECT 1 FROM work LIMIT 1").fetchone():
+            # Seeded before stores had the marker
+            self.db.execute("INSERT INTO meta (key, value) VALUES ('seeded', ?)", (str(now),))
+            return 'seeded'
+        if 'seeder' in meta and float(meta['progress']) > now - self.lease_seconds:
+            return 'wait'
+        self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                            [('seeder', self.worker_id), ('progress', str(now))])
+        return 'seed'
+
+    def _insert(self, chunk):
+        self.db.execute("UPDATE meta SET value = ? WHERE key = 'progress'", (str(time.time()),))
+        if not chunk:
+            return 0
+        return self.db.executemany("INSERT OR IGNORE INTO work (url, updated) VALUES (?, ?)", chunk).rowcount
+
+    def lease(self, n):
+        """Claim up to n pending URLs, or URLs whose previous lease expired."""
+        def claim():
+            now = time.time()
+            rows = self.db.execute("""
+                SELECT url FROM work
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                LIMIT ?""", (now, n)).fetchall()
+            urls = [row[0] for row in rows]
+            self.db.executemany(
+                "UPDATE work SET status = 'leased', owner = ?, lease_expires = ?, updated = ? WHERE url = ?",
+                [(self.worker_id, now + self.lease_seconds, now, url) for url in urls])
+            return urls
+        return self._transaction(claim)
+
+    def heartbeat(self):
+        """Extend every lease this worker holds."""
+        now = time.time()
+        def extend():
+            return self.db.execute(
+                "UPDATE work SET lease_expires = ? WHERE status = 'leased' AND owner = ?",
+                (now + self.lease_seconds, self.worker_id)).rowcount
+        return self._transaction(extend)
+
+    def complete(self, outcomes):
+        """Mark (url, status) pairs finished; status is 'done' or 'dead'."""
+        if not outcomes:
+            return
+        now = time.time()
+        self._transaction(lambda: self.db.executemany(
+            "UPDATE work SET status = ?, owner = ?, lease_expires = NULL, updated = ? WHERE url = ?",
+            [(status, self.worker_id, now, url) for url, status in outcomes]))
+
+    def remaining(self):
+        with self._lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM work WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def close(self):
+        self.db.close()